@@ -0,0 +1,3 @@
+from harness.suite import main
+
+main()
@@ -0,0 +1,244 @@
+import asyncio
+import contextvars
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+import requests
+
+from harness import cleanup, config, credentials, engine, history, metrics, results, sigv4, standin, timing, verify
+from harness.client import Client, SigV4Auth, expired_token, tigris_headers
+from harness.engine import new_record, report
+
+
+class Response:
+    # Mirrors the parts of requests.Response the engine looks at.
+
+    def __init__(self, status_code, headers, digest=None, sent_ns=None, acked_ns=None, content=b""):
+        self.status_code = status_code
+        self.headers = headers
+        self.digest = digest
+        self.sent_ns = sent_ns
+        self.acked_ns = acked_ns
+        self.content = content
+        self.expired_token = False
+
+    @property
+    def text(self):
+        return self.content.decode(errors="replace")
+
+
+class AsyncClient:
+    # Probes and small requests run on the event loop. Payload uploads go
+    # through a requests Client on worker threads instead: generating,
+    # hashing and sending a body is CPU work that would otherwise stall every
+    # iteration timing its probes on the same loop.
+
+    def __init__(self, endpoint, bucket, credentials=None, pool_size=config.pool_size):
+        self.endpoint = endpoint
+        self.bucket = bucket
+        self.auth = SigV4Auth(credentials)
+        self.pool_size = pool_size
+        self.session = None
+        self.uploads = Client(endpoint, bucket, self.auth, pool_size)
+        self.uploaders = ThreadPoolExecutor(pool_size)
+
+    async def open(self):
+        connector = aiohttp.TCPConnector(limit=self.pool_size)
+        self.session = aiohttp.ClientSession(
+            connector=connector, auto_decompress=False, trace_configs=[timing.trace_config()]
+        )
+
+    async def close(self):
+        await self.session.close()
+        self.uploaders.shutdown()
+        self.uploads.close()
+
+    async def upload(self, fn, *args):
+        # Runs a blocking Client call on an upload thread, in the caller's
+        # trace and history context.
+        context = contextvars.copy_context()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.uploaders, context.run, fn, *args)
+        except requests.RequestException as e:
+            raise aiohttp.ClientError(str(e)) from e
+
+    async def request(self, method, path, region=None, consistent=False, data=b"", headers=None):
+        # Like Client.request: signed again once if the session token expired.
+        resp = await self.send(method, path, region, consistent, data, headers)
+        if resp.expired_token:
+            resp = await self.send(method, path, region, consistent, data, headers)
+        return resp
+
+    async def send(self, method, path, region=None, consistent=False, data=b"", headers=None):
+        url = f"{self.endpoint}/{path}"
+        headers = {**tigris_headers(region, consistent), **(headers or {})}
+        payload_hash = hashlib.sha256(data).hexdigest() if data else sigv4.EMPTY_SHA256
+        headers.update(sigv4.sign(method, url, headers, payload_hash, self.auth.credentials))
+        phases = {}
+        t0 = time.perf_counter_ns()
+        try:
+            async with self.session.request(method, url, data=data or None, headers=headers,
+                                            trace_request_ctx=phases) as resp:
+                t_headers = time.perf_counter_ns()
+                digest, content = None, b""
+                if method == "GET" and resp.status < 400:
+                    digest = await verify.astream_digest(resp.content.iter_chunked(verify.chunk_size))
+                else:
+                    content = await resp.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            metrics.request(method, region, "error", 0)
+            history.record(method, path, headers, None, None, t0, None)
+            raise
+        t_end = time.perf_counter_ns()
+        timing.record(method, region, resp.status, resp.headers, t0, t_headers, t_end, phases)
+        history.record(method, path, headers, resp.status, resp.headers, t0, t_end, content)
+        resp = Response(resp.status, resp.headers, digest, t0, t_headers, content)
+        token = headers.get("x-amz-security-token")
+        resp.expired_token = expired_token(method, resp, token)
+        if resp.expired_token:
+            credentials.expired(token)
+        return resp
+
+    async def ensure_bucket(self):
+        resp = await self.request("HEAD", self.bucket)
+        if resp.status_code == 404:
+            resp = await self.request("PUT", self.bucket)
+        if resp.status_code != 200:
+            raise aiohttp.ClientResponseError(None, (), status=resp.status_code, message=f"bucket {self.bucket}")
+
+    async def warm(self, regions):
+        await asyncio.gather(*(self.request("HEAD", self.bucket, region) for region in regions),
+                             self.upload(self.uploads.warm, regions))
+
+    async def put(self, key, data, region=None, consistent=False):
+        return await self.upload(self.uploads.put, key, data, region, consistent)
+
+    async def head(self, key, region=None, consistent=False, headers=None):
+        return await self.request("HEAD", f"{self.bucket}/{key}", region, consistent, headers=headers)
+
+    async def get(self, key, region=None, consistent=False, headers=None):
+        return await self.request("GET", f"{self.bucket}/{key}", region, consistent, headers=headers)
+
+    async def delete(self, key, region=None, consistent=False):
+        return await self.request("DELETE", f"{self.bucket}/{key}", region, consistent)
+
+
+async def probe(client, scenario, key, headers=None):
+    method = client.head if scenario.probe == "HEAD" else client.get
+    responses = await asyncio.gather(
+        *(method(key, region, scenario.consistent, headers) for region in scenario.read_regions)
+    )
+    return dict(zip(scenario.read_regions, responses))
+
+
+class Hooks:
+    # The asyncio runner's I/O for engine.iteration(): probes and deletes on
+    # the event loop, everything that moves or hashes a payload on upload
+    # threads through the engine's own functions.
+
+    def __init__(self, client, scenario):
+        self.client = client
+        self.scenario = scenario
+
+    async def put(self, key, data, region, consistent):
+        return await self.client.put(key, data, region, consistent)
+
+    async def put_multipart(self, key, data, record):
+        return await self.client.upload(engine.put_multipart, self.client.uploads, self.scenario, key, data, record)
+
+    async def put_concurrent(self, key, payloads):
+        # The threaded engine's barrier: writers released onto a busy event
+        # loop would leave as far apart as the loop is behind.
+        return await self.client.upload(engine.put_concurrent, self.client.uploads, self.scenario, key, payloads)
+
+    async def delete(self, key, region, consistent):
+        return await self.client.delete(key, region, consistent)
+
+    async def probe(self, key, headers):
+        return await probe(self.client, self.scenario, key, headers)
+
+    async def digests(self, payloads):
+        return await asyncio.to_thread(lambda: {region: p.digest for region, p in payloads.items()})
+
+    async def check_content(self, key, digests, observed):
+        return await self.client.upload(engine.check_content, self.client.uploads, self.scenario, key, digests,
+                                        observed)
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+
+async def run_iteration(client, scenario, record):
+    steps, hooks, result = engine.iteration(scenario, record), Hooks(client, scenario), None
+    try:
+        while True:
+            hook, *args = steps.send(result)
+            result = await getattr(hooks, hook)(*args)
+    except StopIteration as done:
+        return done.value
+
+
+async def run(client, scenario, sink, iterations=config.iterations, size=None,
+              concurrency=config.concurrency):
+    # Keeps up to `concurrency` iterations in flight at once.
+    semaphore = asyncio.Semaphore(concurrency)
+    stopped = False
+
+    async def one(i):
+        nonlocal stopped
+        async with semaphore:
+            if stopped:
+                return
+            print("Iteration", i + 1)
+            record = new_record(scenario, i, size)
+            try:
+                with timing.recording(record.trace):
+                    await run_iteration(client, scenario, record)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print("Error:", repr(e))
+                record.fail(str(e) or type(e).__name__, "ERROR")
+            sink.write(record)
+            if scenario.stop_on_timeout and record.note == "TIMEOUT":
+                stopped = True
+
+    await asyncio.gather(*(one(i) for i in range(iterations)))
+    return sorted(sink.records, key=lambda r: r.run)
+
+
+async def open_client(scenario, in_flight, endpoint=None, bucket=None, regions=None):
+    # A warmed client with enough connections for `in_flight` iterations;
+    # `regions` replaces the scenario's when several scenarios share it.
+    regions = regions or scenario.regions()
+    endpoint = standin.resolve_endpoint(endpoint or config.endpoint)
+    bucket = bucket or config.bucket
+    pool_size = max(config.pool_size, in_flight * len(regions))
+    client = AsyncClient(endpoint, bucket, pool_size=pool_size)
+    await client.open()
+    await client.ensure_bucket()
+    await client.warm(regions)
+    return client
+
+
+async def run_scenario(scenario, sink, endpoint=None, bucket=None):
+    client = await open_client(scenario, config.concurrency, endpoint, bucket)
+    try:
+        return await run(client, scenario, sink)
+    finally:
+        await client.close()
+
+
+def main(scenario):
+    metrics.serve()
+    print(scenario.title)
+    sink = results.open_sink(config.results)
+    log = history.History(config.history)
+    try:
+        with history.recording(log):
+            records = asyncio.run(run_scenario(scenario, sink))
+    finally:
+        sink.close()
+        log.close()
+        cleanup.after_run([r.key for r in sink.records])
+    report(scenario, records, log)
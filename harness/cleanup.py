@@ -0,0 +1,114 @@
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from harness import config
+from harness.client import connect, xml_field, xml_fields
+from harness.scenarios import SCENARIOS
+
+# DeleteObjects takes at most 1000 keys per call
+BATCH = 1000
+
+
+def default_prefixes():
+    # Every prefix the harness writes under.
+    return sorted({f"{s.key_prefix}-" for s in SCENARIOS.values()} | {"workload-", "sweep-", "list-visibility-"})
+
+
+def delete_batch(client, keys):
+    # Returns (deleted, failed); the request is quiet, so only failures are listed.
+    resp = client.delete_objects(keys)
+    if resp.status_code != 200:
+        return 0, len(keys)
+    failed = len(xml_fields(resp.text, "Error"))
+    return len(keys) - failed, failed
+
+
+def purge(client, keys, workers=config.cleanup_workers):
+    # Deletes `keys` in DeleteObjects batches, `workers` batches at a time.
+    keys = list(dict.fromkeys(k for k in keys if k))
+    batches = [keys[i:i + BATCH] for i in range(0, len(keys), BATCH)]
+    if not batches:
+        return 0, 0
+    with ThreadPoolExecutor(workers) as pool:
+        outcomes = list(pool.map(lambda batch: delete_batch(client, batch), batches))
+    return sum(d for d, _ in outcomes), sum(f for _, f in outcomes)
+
+
+def list_keys(client, prefix, consistent=False):
+    # Yields ListObjectsV2 pages (lists of keys) under `prefix`.
+    token = None
+    while True:
+        resp = client.list_objects(prefix, token, consistent=consistent)
+        resp.raise_for_status()
+        keys = xml_fields(resp.text, "Key")
+        if keys:
+            yield keys
+        token = xml_field(resp.text, "NextContinuationToken")
+        if xml_field(resp.text, "IsTruncated") != "true" or not token:
+            return
+
+
+def sweep(client, prefixes, workers=config.cleanup_workers, consistent=False):
+    # Lists every prefix in parallel and deletes each page as soon as it
+    # arrives, while the listing moves on to the next one.
+    totals = [0, 0]
+    lock = threading.Lock()
+
+    def delete(keys):
+        deleted, failed = delete_batch(client, keys)
+        with lock:
+            totals[0] += deleted
+            totals[1] += failed
+
+    with ThreadPoolExecutor(workers) as deleters, ThreadPoolExecutor(min(workers, len(prefixes) or 1)) as listers:
+        def walk(prefix):
+            return [deleters.submit(delete, keys) for keys in list_keys(client, prefix, consistent)]
+
+        for listing in [listers.submit(walk, prefix) for prefix in prefixes]:
+            for future in listing.result():
+                future.result()
+    return tuple(totals)
+
+
+def report(deleted, failed):
+    print(f"Cleanup: deleted {deleted} objects" + (f", {failed} failed" if failed else ""))
+
+
+def after_run(keys, client=None):
+    # The cleanup stage every entry point ends with: deletes the keys the run
+    # wrote unless CLEANUP=0, through `client` or a fresh one.
+    keys = [k for k in keys if k]
+    if not config.cleanup or not keys:
+        return
+    own = client is None
+    client = client or connect()
+    try:
+        report(*purge(client, keys))
+    finally:
+        if own:
+            client.close()
+
+
+def after_prefix(prefix, client):
+    # after_run for a run that writes under a prefix of its own: lists the
+    # prefix instead of relying on the keys the run got to report, with a
+    # consistent listing so keys still replicating are not missed.
+    if config.cleanup:
+        report(*sweep(client, [prefix], consistent=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete objects left behind by test runs")
+    parser.add_argument("prefixes", nargs="*", help="key prefixes to purge (default: every harness prefix)")
+    parser.add_argument("--workers", type=int, default=config.cleanup_workers)
+    args = parser.parse_args()
+    client = connect()
+    try:
+        report(*sweep(client, args.prefixes or default_prefixes(), args.workers))
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
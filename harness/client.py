@@ -0,0 +1,289 @@
+import base64
+import contextvars
+import hashlib
+import html
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlencode
+
+import requests
+
+from harness import config, credentials, history, metrics, sigv4, standin, timing, verify
+from harness.payload import Payload
+
+
+def load_credentials():
+    return credentials.load()
+
+
+def expired_token(method, resp, token):
+    # S3 turns away a request signed with an expired session token with 400
+    # (some stores 403) and an ExpiredToken error. A HEAD's error has no body,
+    # so there a 400 to a request that carried a session token counts.
+    if not token or resp.status_code not in (400, 403):
+        return False
+    if method == "HEAD":
+        return resp.status_code == 400
+    return b"<Code>ExpiredToken</Code>" in resp.content
+
+
+class SigV4Auth(requests.auth.AuthBase):
+    # Never reads the body: streamed payloads arrive with x-amz-content-sha256
+    # already set (see payload_headers), anything else is hashed here. Signs
+    # with fixed credentials if given, else with the current ones.
+
+    def __init__(self, credentials=None):
+        self.fixed = credentials
+
+    @property
+    def credentials(self):
+        return self.fixed or load_credentials()
+
+    def __call__(self, r):
+        payload_hash = r.headers.pop("x-amz-content-sha256", None)
+        if payload_hash is None:
+            body = r.body or b""
+            if isinstance(body, str):
+                body = body.encode()
+            payload_hash = hashlib.sha256(body).hexdigest() if body else sigv4.EMPTY_SHA256
+        signed = {k: v for k, v in r.headers.items() if k.lower().startswith(("x-tigris-", "x-amz-"))}
+        r.headers.update(sigv4.sign(r.method, r.url, signed, payload_hash, self.credentials))
+        return r
+
+
+def load_auth():
+    return SigV4Auth()
+
+
+def payload_headers(data, signing=None):
+    # Headers that declare how an upload of `data` is signed; only "digest"
+    # needs its SHA-256 before the first byte goes out.
+    signing = signing or config.payload_signing
+    if signing == "unsigned":
+        return {"x-amz-content-sha256": sigv4.UNSIGNED_PAYLOAD}
+    if signing == "streaming":
+        return {
+            "x-amz-content-sha256": sigv4.STREAMING_PAYLOAD,
+            "Content-Encoding": "aws-chunked",
+            "x-amz-decoded-content-length": str(data.size),
+        }
+    if signing == "digest":
+        return {"x-amz-content-sha256": data.digest}
+    raise ValueError(f"unknown PAYLOAD_SIGNING: {signing}")
+
+
+def tigris_headers(region=None, consistent=False):
+    headers = {}
+    if region:
+        headers["X-Tigris-Regions"] = region
+    if consistent:
+        headers["X-Tigris-Consistent"] = "true"
+    return headers
+
+
+def etag_of(resp):
+    return resp.headers.get("ETag", "").strip('"')
+
+
+def xml_field(text, name):
+    match = re.search(f"<{name}>(.*?)</{name}>", text or "", re.S)
+    return html.unescape(match[1]) if match else None
+
+
+def xml_fields(text, name):
+    return [html.unescape(value) for value in re.findall(f"<{name}>(.*?)</{name}>", text or "", re.S)]
+
+
+def delete_body(keys):
+    # Quiet DeleteObjects request: only failures come back.
+    objects = "".join(f"<Object><Key>{html.escape(key, quote=False)}</Key></Object>" for key in keys)
+    return f"<Delete><Quiet>true</Quiet>{objects}</Delete>".encode()
+
+
+def complete_body(etags):
+    # CompleteMultipartUpload request listing {part number: ETag}.
+    parts = "".join(
+        f"<Part><PartNumber>{n}</PartNumber><ETag>\"{etag}\"</ETag></Part>" for n, etag in sorted(etags.items())
+    )
+    return f"<CompleteMultipartUpload>{parts}</CompleteMultipartUpload>".encode()
+
+
+def size_of(resp):
+    return int(resp.headers.get("Content-Length", -1))
+
+
+class Client:
+    # One keep-alive session per region (None is the default replica), so a
+    # probe never pays for a fresh TCP+TLS handshake inside the measured window.
+
+    def __init__(self, endpoint, bucket, auth, pool_size=config.pool_size):
+        self.endpoint = endpoint
+        self.bucket = bucket
+        self.auth = auth
+        self.pool_size = pool_size
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.pool = None
+
+    def session(self, region=None):
+        with self.lock:
+            s = self.sessions.get(region)
+            if s is None:
+                s = requests.Session()
+                adapter = timing.TimedAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                s.mount("http://", adapter)
+                s.mount("https://", adapter)
+                s.auth = self.auth
+                self.sessions[region] = s
+            return s
+
+    def ensure_bucket(self):
+        # HeadBucket instead of listing every bucket; creates it on a 404. The
+        # connection it opens is the one the first iteration reuses.
+        resp = self.request("HEAD", self.bucket)
+        if resp.status_code == 404:
+            resp = self.request("PUT", self.bucket)
+        resp.raise_for_status()
+
+    def warm(self, regions):
+        # Open the connection for every region up front, outside any timing.
+        for region in regions:
+            self.request("HEAD", self.bucket, region)
+
+    def url(self, key):
+        return f"{self.endpoint}/{self.bucket}/{key}"
+
+    def prepare(self, method, path, region=None, consistent=False, headers=None, data=None):
+        # Everything short of the network round trip: headers, signature and
+        # the first payload chunk, so a staged request goes out immediately.
+        headers = {**tigris_headers(region, consistent), **(headers or {})}
+        signer = reader = None
+        if isinstance(data, Payload):
+            headers.update(payload_headers(data))
+            if config.payload_signing == "streaming":
+                signer = sigv4.ChunkSigner(self.auth.credentials)
+            data = reader = data.reader(signer)
+        session = self.session(region)
+        prepared = session.prepare_request(
+            requests.Request(method, f"{self.endpoint}/{path}", data=data, headers=headers)
+        )
+        if signer:
+            # Chunk signatures chain from the request's, known only now.
+            signer.seed(prepared.headers)
+        if reader:
+            reader.prime()
+        settings = session.merge_environment_settings(prepared.url, {}, True, None, None)
+        return region, session, prepared, settings
+
+    def send(self, staged, digest=True):
+        # GET bodies are streamed through a digest and dropped (see resp.digest)
+        # unless digest is False or they carry an error; every request is timed phase by phase into
+        # the active trace.
+        region, session, prepared, settings = staged
+        with timing.setup_phases() as phases:
+            t0 = time.perf_counter_ns()
+            try:
+                resp = session.send(prepared, **settings)
+            except requests.RequestException:
+                metrics.request(prepared.method, region, "error", 0)
+                history.record(prepared.method, prepared.path_url, prepared.headers, None, None, t0, None)
+                raise
+            t_headers = time.perf_counter_ns()
+            with resp:
+                if prepared.method == "GET" and digest and resp.status_code < 400:
+                    resp.digest = verify.stream_digest(resp.iter_content(verify.chunk_size))
+                else:
+                    resp.content
+            t_end = time.perf_counter_ns()
+        resp.sent_ns, resp.acked_ns = t0, t_headers
+        timing.record(prepared.method, region, resp.status_code, resp.headers, t0, t_headers, t_end, phases)
+        history.record(prepared.method, prepared.path_url, prepared.headers, resp.status_code, resp.headers, t0, t_end,
+                       None if prepared.method == "GET" else resp.content)
+        token = prepared.headers.get("x-amz-security-token")
+        resp.expired_token = expired_token(prepared.method, resp, token)
+        if resp.expired_token:
+            credentials.expired(token)
+        return resp
+
+    def request(self, method, path, region=None, consistent=False, headers=None, data=None, digest=True):
+        # A request turned away for an expired session token is signed again
+        # with fresh credentials, once.
+        resp = self.send(self.prepare(method, path, region, consistent, headers, data), digest)
+        if resp.expired_token:
+            resp = self.send(self.prepare(method, path, region, consistent, headers, data), digest)
+        return resp
+
+    def put(self, key, data, region=None, consistent=False):
+        return self.request("PUT", f"{self.bucket}/{key}", region, consistent, data=data)
+
+    def head(self, key, region=None, consistent=False, headers=None):
+        return self.request("HEAD", f"{self.bucket}/{key}", region, consistent, headers)
+
+    def get(self, key, region=None, consistent=False, headers=None):
+        return self.request("GET", f"{self.bucket}/{key}", region, consistent, headers)
+
+    def delete(self, key, region=None, consistent=False):
+        return self.request("DELETE", f"{self.bucket}/{key}", region, consistent)
+
+    def create_multipart(self, key, region=None, consistent=False):
+        return self.request("POST", f"{self.bucket}/{key}?uploads", region, consistent)
+
+    def upload_part(self, key, upload_id, part, region=None, consistent=False):
+        path = f"{self.bucket}/{key}?partNumber={part.number}&uploadId={quote(upload_id)}"
+        return self.request("PUT", path, region, consistent, data=part)
+
+    def complete_multipart(self, key, upload_id, etags, region=None, consistent=False):
+        return self.request("POST", f"{self.bucket}/{key}?uploadId={quote(upload_id)}", region, consistent,
+                            {"Content-Type": "application/xml"}, complete_body(etags))
+
+    def abort_multipart(self, key, upload_id, region=None, consistent=False):
+        return self.request("DELETE", f"{self.bucket}/{key}?uploadId={quote(upload_id)}", region, consistent)
+
+    def list_objects(self, prefix="", token=None, start_after=None, max_keys=1000, region=None, consistent=False):
+        # One ListObjectsV2 page.
+        query = {"list-type": "2", "prefix": prefix, "max-keys": max_keys}
+        if token:
+            query["continuation-token"] = token
+        if start_after:
+            query["start-after"] = start_after
+        path = f"{self.bucket}?{urlencode(query, quote_via=quote)}"
+        return self.request("GET", path, region, consistent, digest=False)
+
+    def delete_objects(self, keys, region=None, consistent=False):
+        body = delete_body(keys)
+        headers = {
+            "Content-Type": "application/xml",
+            "Content-MD5": base64.b64encode(hashlib.md5(body).digest()).decode(),
+        }
+        return self.request("POST", f"{self.bucket}?delete", region, consistent, headers, body)
+
+    def fan_out(self, fn, regions):
+        # Runs fn(region) for every region at once and returns {region: result},
+        # so a round takes as long as the slowest region, not the sum, and the
+        # snapshots are taken at nearly the same moment. Calls keep the
+        # caller's trace context.
+        if len(regions) == 1:
+            return {regions[0]: fn(regions[0])}
+        with self.lock:
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=config.fan_out_workers)
+        futures = {region: self.pool.submit(contextvars.copy_context().run, fn, region) for region in regions}
+        return {region: future.result() for region, future in futures.items()}
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        for s in self.sessions.values():
+            s.close()
+        self.sessions = {}
+
+
+def connect(endpoint=None, bucket=None):
+    endpoint = standin.resolve_endpoint(endpoint or config.endpoint)
+    bucket = bucket or config.bucket
+    client = Client(endpoint, bucket, load_auth())
+    client.ensure_bucket()
+    return client
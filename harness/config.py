@@ -0,0 +1,49 @@
+import os
+
+# ---------- CONFIG ----------
+endpoint = os.getenv("ENDPOINT", "https://t3.storage.dev")
+bucket = os.getenv("BUCKET", "tigris-consistency-test-bucket")
+iterations = int(os.getenv("ITERATIONS", "10"))
+file_size_bytes = int(os.getenv("FILE_SIZE_BYTES", str(1024 * 1024)))  # 1MB
+# seeds payload content; unset draws a fresh seed per run
+seed = int(os.environ["SEED"]) if os.getenv("SEED") else None
+# multipart scenarios: object size, part size and parts uploaded at once
+# how uploads are signed: "digest" hashes the payload before sending,
+# "unsigned" sends UNSIGNED-PAYLOAD and "streaming" signs aws-chunked chunks
+# as they go out; the last two hash the content once, on its way out
+payload_signing = os.getenv("PAYLOAD_SIGNING", "digest")
+# payloads up to this size keep their chunks after being hashed up front
+payload_cache_bytes = int(os.getenv("PAYLOAD_CACHE_BYTES", str(8 * 1024 * 1024)))  # 8MB
+multipart_size_bytes = int(os.getenv("MULTIPART_SIZE_BYTES", str(256 * 1024 * 1024)))  # 256MB
+part_size_bytes = int(os.getenv("PART_SIZE_BYTES", str(16 * 1024 * 1024)))  # 16MB
+part_concurrency = int(os.getenv("PART_CONCURRENCY", "8"))
+# connections kept alive per region session
+pool_size = 10
+# threads probing regions in parallel within one poll round
+fan_out_workers = int(os.getenv("FAN_OUT_WORKERS", "8"))
+# iterations in flight at once; above 1 switches to the asyncio runner
+concurrency = int(os.getenv("CONCURRENCY", "1"))
+# delete every object a run created once it finishes; CLEANUP=0 keeps them
+cleanup = os.getenv("CLEANUP", "1") != "0"
+cleanup_workers = int(os.getenv("CLEANUP_WORKERS", "8"))
+# comma-separated result files appended per iteration (.jsonl or .csv)
+results = os.getenv("RESULTS", "results.jsonl")
+# operation history (JSONL) kept for the linearizability check; empty keeps it in memory only
+history = os.getenv("HISTORY", "")
+# serve live Prometheus/OpenMetrics metrics at http://METRICS_HOST:METRICS_PORT/metrics; unset is off
+metrics_port = int(os.getenv("METRICS_PORT") or 0)
+metrics_host = os.getenv("METRICS_HOST", "127.0.0.1")
+# response header naming the region that served a request (the stand-in sets it)
+region_header = os.getenv("REGION_HEADER", "X-Tigris-Served-Region")
+# ---------- POLLING ----------
+# "adaptive" probes densely right after the write and then backs off;
+# "fixed" polls every scenario poll_interval like the original scripts
+polling = os.getenv("POLLING", "adaptive")
+poll_initial_interval = float(os.getenv("POLL_INITIAL_INTERVAL", "0.002"))
+poll_dense_seconds = float(os.getenv("POLL_DENSE_SECONDS", "0.05"))
+poll_max_interval = float(os.getenv("POLL_MAX_INTERVAL", "5.0"))
+# ---------- LOCAL STAND-IN (ENDPOINT=standin) ----------
+standin_regions = os.getenv("STANDIN_REGIONS", "sjc,fra").split(",")
+standin_default_region = os.getenv("STANDIN_DEFAULT_REGION", "fra")
+# median ~50ms replication lag
+standin_delay = os.getenv("STANDIN_DELAY", "lognormal:-3.0,0.5")
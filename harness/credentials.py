@@ -0,0 +1,78 @@
+import configparser
+import os
+import threading
+from collections import namedtuple
+
+Credentials = namedtuple("Credentials", "access_key secret_key token")
+
+# Profile settings that need botocore's providers rather than static keys
+_DELEGATED = ("role_arn", "credential_process", "sso_start_url", "sso_session", "web_identity_token_file")
+
+# Static credentials found last, or the botocore credentials to ask every
+# time: those refresh themselves ahead of their expiry.
+_loaded = None
+_lock = threading.Lock()
+
+
+def _profile(path, section):
+    parser = configparser.RawConfigParser()
+    if not parser.read(os.path.expanduser(path)) or not parser.has_section(section):
+        return None
+    return parser[section]
+
+
+def _static(section):
+    if section is None or any(name in section for name in _DELEGATED):
+        return None
+    if "aws_access_key_id" in section and "aws_secret_access_key" in section:
+        return Credentials(section["aws_access_key_id"], section["aws_secret_access_key"],
+                           section.get("aws_session_token"))
+    return None
+
+
+def _resolve():
+    # Static keys from the environment or the shared credentials/config files,
+    # in the order the AWS CLI checks them, without importing an SDK. Roles,
+    # SSO and credential processes fall back to botocore, imported only then.
+    if os.getenv("AWS_ACCESS_KEY_ID") and os.getenv("AWS_SECRET_ACCESS_KEY"):
+        return Credentials(os.environ["AWS_ACCESS_KEY_ID"], os.environ["AWS_SECRET_ACCESS_KEY"],
+                           os.getenv("AWS_SESSION_TOKEN"))
+    name = os.getenv("AWS_PROFILE") or os.getenv("AWS_DEFAULT_PROFILE") or "default"
+    config = _profile(os.getenv("AWS_CONFIG_FILE", "~/.aws/config"), name if name == "default" else f"profile {name}")
+    delegated = config is not None and any(option in config for option in _DELEGATED)
+    if not delegated and not os.getenv("AWS_WEB_IDENTITY_TOKEN_FILE"):
+        shared = _profile(os.getenv("AWS_SHARED_CREDENTIALS_FILE", "~/.aws/credentials"), name)
+        found = _static(shared) or _static(config)
+        if found:
+            return found
+    import botocore.session
+
+    resolved = botocore.session.Session().get_credentials()
+    if resolved is None:
+        raise RuntimeError("no AWS credentials found")
+    return resolved
+
+
+def load():
+    # The credentials to sign with now. Temporary ones from botocore (roles,
+    # SSO, credential processes) are renewed before they expire, so a run
+    # that outlives a session keeps signing with valid ones.
+    global _loaded
+    with _lock:
+        if _loaded is None:
+            _loaded = _resolve()
+        loaded = _loaded
+    if isinstance(loaded, Credentials):
+        return loaded
+    frozen = loaded.get_frozen_credentials()
+    return Credentials(frozen.access_key, frozen.secret_key, frozen.token)
+
+
+def expired(token):
+    # The server rejected `token` as expired: the next load() looks the
+    # credentials up again (new keys written to the shared files, a fresh
+    # session from botocore), unless another request already did.
+    global _loaded
+    with _lock:
+        if _loaded is not None and _loaded.token == token:
+            _loaded = None
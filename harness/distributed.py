@@ -0,0 +1,401 @@
+import argparse
+import hashlib
+import json
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+from harness import cleanup, config, engine, metrics, payload, polling, results, standin
+from harness.client import connect, etag_of
+from harness.scenarios import SCENARIOS
+
+# Ops an agent pair can measure: readers wait for the last write's ETag.
+SUPPORTED = ("write", "overwrite")
+# Exchanges per clock-offset estimate, and how often agents redo it
+SYNC_SAMPLES = 8
+SYNC_SECONDS = 10.0
+# Seconds a task request waits on the coordinator before the agent asks again
+LONG_POLL = 20.0
+
+# Wall-clock anchor: timestamps advance with perf_counter so a clock step
+# on the host doesn't land in a measurement.
+_wall0, _perf0 = time.time_ns(), time.perf_counter_ns()
+
+
+def local(perf_ns):
+    return _wall0 + perf_ns - _perf0
+
+
+def now():
+    return local(time.perf_counter_ns())
+
+
+def estimate_offset(session, coordinator, samples=SYNC_SAMPLES):
+    # NTP-style: with t0/t3 the local send/receive and t1/t2 the
+    # coordinator's receive/send, offset = ((t1 - t0) + (t2 - t3)) / 2 and
+    # round trip = (t3 - t0) - (t2 - t1). Keeps the exchange with the
+    # shortest round trip; its offset is wrong by at most half of it.
+    best = None
+    for _ in range(samples):
+        t0 = now()
+        resp = session.get(f"{coordinator}/time")
+        t3 = now()
+        t1, t2 = resp.json()["received"], resp.json()["sent"]
+        delay = (t3 - t0) - (t2 - t1)
+        if best is None or delay < best[1]:
+            best = ((t1 - t0 + t2 - t3) // 2, delay)
+    return best[0], best[1] // 2
+
+
+# ---------- Coordinator ----------
+class Coordinator:
+    # Hands every reader the key to watch, releases the writer once they are
+    # all polling, and collects what each agent saw on the coordinator's clock.
+
+    def __init__(self, scenario, readers, endpoint, bucket):
+        self.scenario = scenario
+        self.readers = readers
+        self.endpoint = endpoint
+        self.bucket = bucket
+        self.cond = threading.Condition()
+        self.agents = {}
+        self.tasks = {}
+        self.ready = set()
+        self.results = {}
+        self.current = None
+        self.stopped = False
+
+    def role(self, role):
+        return [agent for agent, info in self.agents.items() if info["role"] == role]
+
+    def register(self, role, region=None):
+        with self.cond:
+            if role == "writer":
+                if self.role("writer"):
+                    raise ValueError("a writer is already registered")
+                region = region or self.scenario.put_regions[0]
+            elif role == "reader":
+                if len(self.role("reader")) >= self.readers:
+                    raise ValueError(f"all {self.readers} readers are registered")
+                regions = self.scenario.read_regions
+                region = region or regions[len(self.role("reader")) % len(regions)]
+            else:
+                raise ValueError(f"unknown role: {role}")
+            agent = f"{role}-{len(self.agents) + 1}"
+            self.agents[agent] = {"role": role, "region": region}
+            self.cond.notify_all()
+        print(f"Registered {agent} ({region or 'default'})")
+        return {"agent": agent, "region": region, "scenario": self.scenario.name, "endpoint": self.endpoint,
+                "bucket": self.bucket}
+
+    def next_task(self, agent, timeout=LONG_POLL):
+        with self.cond:
+            self.cond.wait_for(lambda: self.stopped or self.tasks.get(agent), timeout)
+            if self.stopped:
+                return {"stop": True}
+            return self.tasks.pop(agent, None) or {"idle": True}
+
+    def mark_ready(self, agent, run):
+        with self.cond:
+            if self.current == run:
+                self.ready.add(agent)
+                self.cond.notify_all()
+
+    def submit(self, agent, result):
+        with self.cond:
+            if self.current == result["run"]:
+                self.results[agent] = result
+                self.cond.notify_all()
+
+    def run(self, sink, iterations, size=None):
+        with self.cond:
+            self.cond.wait_for(lambda: len(self.role("writer")) == 1 and len(self.role("reader")) == self.readers)
+        writer, readers = self.role("writer")[0], self.role("reader")
+        timeout = self.scenario.max_poll_seconds + 60
+        try:
+            for i in range(iterations):
+                print("Iteration", i + 1)
+                record = engine.new_record(self.scenario, i, size)
+                writes = 2 if self.scenario.op == "overwrite" else 1
+                task = {"run": record.run, "key": record.key, "size": record.size,
+                        "seeds": [payload.new(record.size).seed for _ in range(writes)]}
+                with self.cond:
+                    self.current, self.ready, self.results = record.run, set(), {}
+                    self.tasks.update({reader: task for reader in readers})
+                    self.cond.notify_all()
+                    if self.cond.wait_for(lambda: self.ready >= set(readers), timeout):
+                        self.tasks[writer] = task
+                        self.cond.notify_all()
+                        self.cond.wait_for(lambda: len(self.results) == len(self.agents), timeout)
+                    collected = dict(self.results)
+                sink.write(self.assemble(record, collected, writer, readers))
+        finally:
+            with self.cond:
+                self.stopped = True
+                self.cond.notify_all()
+        return sink.records
+
+    def assemble(self, record, collected, writer, readers):
+        # Times are relative to the last write's ack; convergence is when the
+        # slowest reader's first fresh probe returned.
+        record.put_regions = [self.agents[writer]["region"] or "default"]
+        record.read_regions = [self.agents[r]["region"] or "default" for r in readers]
+        missing = [agent for agent in [writer, *readers] if agent not in collected]
+        if missing:
+            return record.fail(f"no result from {', '.join(missing)}", "ERROR")
+        written = collected[writer]
+        if written.get("error"):
+            return record.fail(written["error"], "ERROR")
+        origin, ack = written["writes"][0]["sent"], written["writes"][-1]["acked"]
+        record.writes = [
+            {"region": record.put_regions[0], "send_ns": w["sent"] - origin, "ack_ns": w["acked"] - origin,
+             "status": w["status"], "etag": w["etag"]}
+            for w in written["writes"]
+        ]
+        if any(w["status"] != 200 for w in written["writes"]):
+            return record.fail("PUT Failed")
+        seen = [collected[r] for r in readers]
+        errors = [s["error"] for s in seen if s.get("error")]
+        if errors:
+            return record.fail(errors[0], "ERROR")
+
+        def since_ack(t):
+            return None if t is None else t - ack
+
+        record.reads = [
+            {"region": s["region"], "status": s["status"], "probes": s["probes"],
+             "last_stale_ns": since_ack(s["last_stale"]), "fresh_sent_ns": since_ack(s["fresh_sent"]),
+             "fresh_ack_ns": since_ack(s["fresh_acked"]), "error_ns": s["error_ns"]}
+            for s in seen
+        ]
+        record.attempts = sum(s["probes"] for s in seen)
+        record.clock_error_ns = written["error_ns"] + max(s["error_ns"] for s in seen)
+        if any(s["status"] == "TIMEOUT" for s in seen):
+            return record.fail("TIMEOUT")
+        record.convergence_ns = max(max(s["fresh_acked"] for s in seen) - ack, 0)
+        stale = [s["last_stale"] for s in seen if s["last_stale"] is not None]
+        record.last_stale_ns = max(max(stale) - ack, 0) if stale else 0
+        record.status = "MISMATCH" if any(s["status"] == "MISMATCH" for s in seen) else "PASS"
+        return record
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        received = now()
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        coordinator = self.server.coordinator
+        if parts.path == "/time":
+            self.reply(200, {"received": received, "sent": now()})
+        elif parts.path == "/task":
+            self.reply(200, coordinator.next_task(query["agent"][0]))
+        else:
+            self.reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        coordinator = self.server.coordinator
+        try:
+            if self.path == "/register":
+                self.reply(200, coordinator.register(body["role"], body.get("region")))
+            elif self.path == "/ready":
+                coordinator.mark_ready(body["agent"], body["run"])
+                self.reply(200, {})
+            elif self.path == "/result":
+                coordinator.submit(body["agent"], body)
+                self.reply(200, {})
+            else:
+                self.reply(404, {"error": "not found"})
+        except (KeyError, ValueError) as e:
+            self.reply(400, {"error": str(e)})
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, coordinator):
+        super().__init__(address, Handler)
+        self.coordinator = coordinator
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def serve(coordinator, host="127.0.0.1", port=0):
+    server = Server((host, port), coordinator)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ---------- Agents ----------
+def expected_etags(data):
+    # MD5 ETag a single PUT of `data` gets, and the SHA-256 a read is checked against.
+    md5 = hashlib.md5()
+    for chunk in data.chunks():
+        md5.update(chunk)
+    return md5.hexdigest(), data.digest
+
+
+def write(client, scenario, task, region, offset):
+    writes = []
+    for seed in task["seeds"]:
+        resp = client.put(task["key"], payload.Payload(seed, task["size"]), region, scenario.consistent)
+        writes.append({"sent": local(resp.sent_ns) + offset, "acked": local(resp.acked_ns) + offset,
+                       "status": resp.status_code, "etag": etag_of(resp)})
+        if resp.status_code != 200:
+            break
+    return {"writes": writes}
+
+
+def watch(client, scenario, task, region, offset, ready):
+    # Polls until the object carries the last write's ETag, telling the
+    # coordinator after the first probe that it may release the writer;
+    # the schedule's clock and the deadline start there.
+    etag, digest = expected_etags(payload.Payload(task["seeds"][-1], task["size"]))
+    headers = {"If-Match": f'"{etag}"'}
+    schedule = polling.for_scenario(scenario)
+    seen = {"region": region, "probes": 0, "last_stale": None, "fresh_sent": None, "fresh_acked": None}
+    while True:
+        resp = client.head(task["key"], region, scenario.consistent, headers)
+        seen["probes"] += 1
+        if seen["probes"] == 1:
+            ready()
+            start = time.perf_counter_ns()
+            deadline = start + int(scenario.max_poll_seconds * 1e9)
+        if resp.status_code == 200:
+            seen["fresh_sent"], seen["fresh_acked"] = local(resp.sent_ns) + offset, local(resp.acked_ns) + offset
+            break
+        seen["last_stale"] = local(resp.sent_ns) + offset
+        if resp.acked_ns > deadline:
+            return {**seen, "status": "TIMEOUT"}
+        time.sleep(schedule.delay((time.perf_counter_ns() - start) / 1e9))
+    body = client.get(task["key"], region, scenario.consistent)
+    matched = body.status_code == 200 and getattr(body, "digest", None) == digest
+    return {**seen, "status": "PASS" if matched else "MISMATCH"}
+
+
+def agent(coordinator, role, region=None, endpoint=None, bucket=None):
+    # Registers, then runs tasks until the coordinator says stop. Every
+    # timestamp sent back is on the coordinator's clock.
+    session = requests.Session()
+    resp = session.post(f"{coordinator}/register", json={"role": role, "region": region})
+    resp.raise_for_status()
+    info = resp.json()
+    scenario = SCENARIOS[info["scenario"]]
+    client = connect(endpoint or info["endpoint"], bucket or info["bucket"])
+    client.warm([info["region"]])
+    synced, offset, error = 0, 0, 0
+    try:
+        while True:
+            if time.monotonic() - synced > SYNC_SECONDS:
+                offset, error = estimate_offset(session, coordinator)
+                synced = time.monotonic()
+            task = session.get(f"{coordinator}/task", params={"agent": info["agent"]}, timeout=LONG_POLL + 30).json()
+            if task.get("stop"):
+                return
+            if task.get("idle"):
+                continue
+
+            def ready():
+                session.post(f"{coordinator}/ready", json={"agent": info["agent"], "run": task["run"]})
+
+            try:
+                if role == "writer":
+                    result = write(client, scenario, task, info["region"], offset)
+                else:
+                    result = watch(client, scenario, task, info["region"], offset, ready)
+            except requests.RequestException as e:
+                result = {"status": "ERROR", "error": str(e)}
+                if role == "reader":
+                    ready()
+            session.post(f"{coordinator}/result",
+                         json={**result, "agent": info["agent"], "run": task["run"], "error_ns": error})
+    finally:
+        client.close()
+
+
+# ---------- Entry points ----------
+def check_scenario(parser, name):
+    scenario = SCENARIOS[name]
+    if scenario.op not in SUPPORTED or scenario.part_size:
+        parser.error(f"{name}: distributed runs support single-part {' and '.join(SUPPORTED)} scenarios")
+    return scenario
+
+
+def coordinate(scenario, readers, host, port, spawn=False):
+    # Runs the iterations and reports; with spawn the writer and readers run
+    # as local subprocesses (for trying it out against the stand-in).
+    metrics.serve()
+    endpoint = standin.resolve_endpoint(config.endpoint)
+    coordinator = Coordinator(scenario, readers, endpoint, config.bucket)
+    server = serve(coordinator, host, port)
+    print(scenario.title)
+    print(f"Coordinator at {server.url}; waiting for a writer and {readers} readers")
+    agents = []
+    if spawn:
+        agents = [subprocess.Popen([sys.executable, "-m", "harness.distributed", "agent", role,
+                                    "--coordinator", server.url])
+                  for role in ["writer"] + ["reader"] * readers]
+    sink = results.open_sink(config.results)
+    try:
+        records = coordinator.run(sink, config.iterations)
+    finally:
+        sink.close()
+        for process in agents:
+            process.wait(timeout=LONG_POLL + 30)
+        cleanup.after_run([r.key for r in sink.records])
+    engine.report(scenario, records)
+    errors = [r.clock_error_ns for r in records if r.clock_error_ns is not None]
+    if errors:
+        print(f"Clock offset error bound: up to {max(errors) / 1e6:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a scenario with writer and reader agents on separate hosts")
+    modes = parser.add_subparsers(dest="mode", required=True)
+    for mode, help in (("coordinator", "hand out keys and collect results"),
+                       ("local", "coordinator plus agent subprocesses on this machine")):
+        sub = modes.add_parser(mode, help=help)
+        sub.add_argument("scenario", nargs="?", default="write-cross-region")
+        sub.add_argument("--readers", type=int, default=1)
+        sub.add_argument("--host", default="0.0.0.0" if mode == "coordinator" else "127.0.0.1")
+        sub.add_argument("--port", type=int, default=8700 if mode == "coordinator" else 0)
+    sub = modes.add_parser("agent", help="run as the writer or a reader")
+    sub.add_argument("role", choices=["writer", "reader"])
+    sub.add_argument("--coordinator", required=True, help="coordinator URL, e.g. http://10.0.0.1:8700")
+    sub.add_argument("--region", help="region to pin requests to (default: assigned from the scenario)")
+    sub.add_argument("--endpoint", help="S3 endpoint (default: the coordinator's)")
+    sub.add_argument("--bucket")
+    args = parser.parse_args()
+    if args.mode == "agent":
+        agent(args.coordinator.rstrip("/"), args.role, args.region, args.endpoint, args.bucket)
+        return
+    if args.scenario not in SCENARIOS:
+        parser.error(f"unknown scenario: {args.scenario}")
+    scenario = check_scenario(parser, args.scenario)
+    coordinate(scenario, args.readers, args.host, args.port, spawn=args.mode == "local")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+import contextvars
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+
+import requests
+
+from harness import cleanup, config, history, metrics, payload, polling, results, timing
+from harness.client import connect, etag_of, size_of, xml_field
+from harness.scenarios import SCENARIOS
+
+
+def conditions(scenario, etags):
+    # Conditional probe headers so the server answers without a body until the
+    # object converges: If-Match on the expected ETag is a 412 while a stale
+    # version is served, and If-None-Match on every written ETag is a 304
+    # (which still carries the ETag) while a region holds one of them.
+    if not etags or scenario.op == "delete":
+        return {}
+    quoted = ", ".join(f'"{etag}"' for etag in etags)
+    if scenario.op == "concurrent":
+        return {"If-None-Match": quoted}
+    return {"If-Match": quoted}
+
+
+def probe(client, scenario, key, headers=None):
+    method = client.head if scenario.probe == "HEAD" else client.get
+    return client.fan_out(lambda region: method(key, region, scenario.consistent, headers), scenario.read_regions)
+
+
+def observed_etag(r, size):
+    if r.status_code == 304:
+        return etag_of(r)
+    if r.status_code == 200 and size_of(r) == size:
+        return etag_of(r)
+    return None
+
+
+def agreed_etag(observed, size):
+    # ETag every polled region agrees on, or None while they differ or lag.
+    etags = {observed_etag(r, size) for r in observed.values()}
+    if len(etags) != 1 or None in etags:
+        return None
+    return etags.pop()
+
+
+def converged(scenario, observed, expected_etag, size):
+    if scenario.op == "delete":
+        return all(r.status_code == 404 for r in observed.values())
+    etag = agreed_etag(observed, size)
+    if etag is None:
+        return False
+    return scenario.op == "concurrent" or etag == expected_etag
+
+
+def put_concurrent(client, scenario, key, payloads):
+    # Every writer stages its request, then all are released from one barrier.
+    barrier = threading.Barrier(len(payloads))
+    writes = {}
+
+    def put_object(region):
+        staged = client.prepare("PUT", f"{client.bucket}/{key}", region, scenario.consistent, data=payloads[region])
+        try:
+            barrier.wait(timeout=30)
+            writes[region] = client.send(staged)
+        except (requests.RequestException, threading.BrokenBarrierError) as e:
+            print(f"Error uploading {key} to {region}: {e}")
+
+    # Each writer thread records into the caller's trace.
+    threads = [
+        Thread(target=contextvars.copy_context().run, args=(put_object, region))
+        for region in scenario.put_regions
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return writes
+
+
+def record_writes(record, writes):
+    # Send and ack times of each writer relative to the first send, and the
+    # skew between the first and last send; returns the ETags written.
+    if not writes:
+        return []
+    origin = min(r.sent_ns for r in writes.values())
+    record.writes = [
+        {
+            "region": region,
+            "send_ns": r.sent_ns - origin,
+            "ack_ns": r.acked_ns - origin,
+            "status": r.status_code,
+            "etag": etag_of(r),
+        }
+        for region, r in sorted(writes.items(), key=lambda item: item[1].sent_ns)
+    ]
+    record.skew_ns = record.writes[-1]["send_ns"]
+    return [w["etag"] for w in record.writes if w["status"] == 200]
+
+
+def check_content(client, scenario, key, digests, observed):
+    # Compare every read region's body digest with the ones taken at upload,
+    # reusing the converged probe's body when it was a full GET; returns
+    # (winner, status).
+    stale = [r for r in scenario.read_regions
+             if observed[r].status_code != 200 or getattr(observed[r], "digest", None) is None]
+    fetched = client.fan_out(lambda region: client.get(key, region, scenario.consistent), stale) if stale else {}
+    winner = None
+    for region in scenario.read_regions:
+        r = fetched.get(region, observed[region])
+        if r.status_code != 200:
+            return winner, "MISMATCH"
+        matched = [w for w, digest in digests.items() if digest == r.digest]
+        if not matched or (winner is not None and matched[0] != winner):
+            return winner, "MISMATCH"
+        winner = matched[0]
+    return winner, "PASS"
+
+
+def new_record(scenario, i, size=None):
+    size = size or scenario.size or config.file_size_bytes
+    return results.Record.for_scenario(scenario, i + 1, f"{scenario.key_prefix}-{uuid.uuid4()}", size)
+
+
+def put_multipart(client, scenario, key, data, record):
+    # Initiate, upload the parts PART_CONCURRENCY at a time, complete; returns
+    # the completion response and the composite ETag. The upload is timed
+    # from initiation to the completion ack.
+    region = scenario.put_regions[0]
+    resp = client.create_multipart(key, region, scenario.consistent)
+    if resp.status_code != 200:
+        return resp, None
+    started, upload_id = resp.sent_ns, xml_field(resp.text, "UploadId")
+    parts = data.parts(scenario.part_size)
+    with ThreadPoolExecutor(config.part_concurrency) as pool:
+        futures = [
+            pool.submit(contextvars.copy_context().run, client.upload_part, key, upload_id, part, region,
+                        scenario.consistent)
+            for part in parts
+        ]
+        uploaded = [future.result() for future in futures]
+    failed = [r for r in uploaded if r.status_code != 200]
+    if failed:
+        client.abort_multipart(key, upload_id, region, scenario.consistent)
+        return failed[0], None
+    etags = {part.number: etag_of(r) for part, r in zip(parts, uploaded)}
+    resp = client.complete_multipart(key, upload_id, etags, region, scenario.consistent)
+    etag = xml_field(resp.text, "ETag")
+    record.parts = len(parts)
+    record.upload_ns = resp.acked_ns - started
+    return resp, etag and etag.strip('"')
+
+
+def iteration(scenario, record):
+    # One iteration's steps, shared by the threaded and asyncio runners: the
+    # writes, the probe schedule, the timing and the verdict. Every piece of
+    # I/O is yielded as (hook, *args) and the runner sends back the hook's
+    # result (see Hooks); only the hooks differ between runners.
+    key, size = record.key, record.size
+    expected_etag = None
+    if scenario.op == "concurrent":
+        payloads = {region: payload.new(size) for region in scenario.put_regions}
+        etags = record_writes(record, (yield "put_concurrent", key, payloads))
+    else:
+        region = scenario.put_regions[0]
+        for _ in range(2 if scenario.op == "overwrite" else 1):
+            p = payload.new(size)
+            if scenario.part_size:
+                resp, expected_etag = yield "put_multipart", key, p, record
+            else:
+                resp = yield "put", key, p, region, scenario.consistent
+                expected_etag = etag_of(resp)
+            if resp.status_code != 200 or not expected_etag:
+                return record.fail("PUT Failed")
+        etags = [expected_etag]
+        payloads = {region: p}
+        if scenario.op == "delete":
+            resp = yield "delete", key, region, scenario.consistent
+            if resp.status_code not in [204, 200]:
+                return record.fail("DELETE Failed")
+    # The initial probe is not counted: if it already sees the write, convergence is 0.
+    schedule = polling.for_scenario(scenario)
+    headers = conditions(scenario, etags)
+    observed = yield "probe", key, headers
+    start = time.perf_counter_ns()
+    deadline = start + int(scenario.max_poll_seconds * 1e9)
+    record.attempts = 0
+    sent = last_stale = 0
+    while True:
+        if converged(scenario, observed, expected_etag, size):
+            # Convergence happened after the last stale probe was sent and
+            # before the first fresh one returned.
+            record.convergence_ns = time.perf_counter_ns() - start
+            record.last_stale_ns = last_stale
+            record.status = "PASS"
+            if scenario.op != "delete":
+                digests = yield "digests", payloads
+                winner, record.status = yield "check_content", key, digests, observed
+                if scenario.op == "concurrent":
+                    record.winner = winner
+            return record
+        last_stale = sent
+        now = time.perf_counter_ns()
+        if now >= deadline:
+            return record.fail("TIMEOUT")
+        yield "sleep", min(schedule.delay((now - start) / 1e9), (deadline - now) / 1e9)
+        record.attempts += 1
+        sent = time.perf_counter_ns() - start
+        observed = yield "probe", key, headers
+
+
+class Hooks:
+    # The threaded runner's I/O for iteration().
+
+    def __init__(self, client, scenario):
+        self.client = client
+        self.scenario = scenario
+
+    def put(self, key, data, region, consistent):
+        return self.client.put(key, data, region, consistent)
+
+    def put_multipart(self, key, data, record):
+        return put_multipart(self.client, self.scenario, key, data, record)
+
+    def put_concurrent(self, key, payloads):
+        return put_concurrent(self.client, self.scenario, key, payloads)
+
+    def delete(self, key, region, consistent):
+        return self.client.delete(key, region, consistent)
+
+    def probe(self, key, headers):
+        return probe(self.client, self.scenario, key, headers)
+
+    def digests(self, payloads):
+        # After the writes: unless PAYLOAD_SIGNING=digest they hashed the
+        # content on the way out.
+        return {region: p.digest for region, p in payloads.items()}
+
+    def check_content(self, key, digests, observed):
+        return check_content(self.client, self.scenario, key, digests, observed)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+def run_iteration(client, scenario, record):
+    steps, hooks, result = iteration(scenario, record), Hooks(client, scenario), None
+    try:
+        while True:
+            hook, *args = steps.send(result)
+            result = getattr(hooks, hook)(*args)
+    except StopIteration as done:
+        return done.value
+
+
+def run(client, scenario, sink, iterations=config.iterations, size=None):
+    for i in range(iterations):
+        print("Iteration", i + 1)
+        record = new_record(scenario, i, size)
+        try:
+            with timing.recording(record.trace):
+                run_iteration(client, scenario, record)
+        except requests.RequestException as e:
+            print("Error:", e)
+            record.fail(str(e), "ERROR")
+        sink.write(record)
+        if scenario.stop_on_timeout and record.note == "TIMEOUT":
+            break
+    return sink.records
+
+
+def report(scenario, records, log=None):
+    print(results.grid(records, winners=scenario.op == "concurrent"))
+    print(results.summary_table(records))
+    if scenario.op == "concurrent":
+        print(results.winners_table(records))
+    if scenario.part_size:
+        print(results.upload_table(records))
+    if log is not None and scenario.consistent:
+        print(history.report(history.check(log.ops)))
+
+
+def main(name):
+    scenario = SCENARIOS[name]
+    metrics.serve()
+    if config.concurrency > 1:
+        from harness import aio
+        aio.main(scenario)
+        return
+    print(scenario.title)
+    client = connect()
+    client.warm(scenario.regions())
+    sink = results.open_sink(config.results)
+    log = history.History(config.history)
+    try:
+        with history.recording(log):
+            records = run(client, scenario, sink)
+    finally:
+        sink.close()
+        log.close()
+        try:
+            cleanup.after_run([r.key for r in sink.records], client)
+        finally:
+            client.close()
+    report(scenario, records, log)
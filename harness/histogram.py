@@ -0,0 +1,67 @@
+import math
+
+
+class Histogram:
+    # Log-linear buckets as in HdrHistogram: a value keeps only its top
+    # `sub_bits` bits, so every recorded value is within 1% (at 8 bits) of
+    # what is reported, memory stays a few hundred buckets per decade range,
+    # and histograms merge by adding counts.
+
+    def __init__(self, sub_bits=8):
+        self.sub_bits = sub_bits
+        self.counts = {}
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, value):
+        shift = max(value.bit_length() - self.sub_bits, 0)
+        return shift << self.sub_bits | value >> shift
+
+    def _highest(self, index):
+        # Largest value that lands in the bucket, as HdrHistogram reports.
+        shift, sub = index >> self.sub_bits, index & ((1 << self.sub_bits) - 1)
+        return ((sub + 1) << shift) - 1
+
+    def record(self, value, count=1):
+        value = max(int(value), 0)
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total += count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q):
+        if not self.total:
+            return None
+        target = max(math.ceil(q * self.total), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._highest(index), self.max)
+        return self.max
+
+    def __len__(self):
+        return self.total
+
+    def to_dict(self):
+        return {"sub_bits": self.sub_bits, "min": self.min, "max": self.max,
+                "counts": sorted(self.counts.items())}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data["sub_bits"])
+        histogram.counts = {index: count for index, count in data["counts"]}
+        histogram.total = sum(histogram.counts.values())
+        histogram.min, histogram.max = data["min"], data["max"]
+        return histogram
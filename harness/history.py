@@ -0,0 +1,388 @@
+import argparse
+import contextvars
+import html
+import json
+import re
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, replace
+from urllib.parse import unquote
+
+from tabulate import tabulate
+
+# Value of a write whose outcome and ETag are unknown; matches any read.
+ANY = "*"
+
+# History the current run appends operations to
+_history = contextvars.ContextVar("history", default=None)
+
+
+@dataclass
+class Op:
+    key: str
+    # "write" (PUT, or DELETE with value None) or "read" (GET/HEAD, None is a 404)
+    kind: str
+    value: str
+    invoke_ns: int
+    # None when no response came back: the write may or may not have happened
+    complete_ns: int
+    method: str = ""
+    region: str = "default"
+    consistent: bool = False
+    status: int = None
+
+
+class History:
+    # Thread-safe operation log, appended to a JSONL file as it grows.
+
+    def __init__(self, path=None):
+        self.ops = []
+        self.lock = threading.Lock()
+        self.file = open(path, "a") if path else None
+
+    def append(self, op):
+        with self.lock:
+            self.ops.append(op)
+            if self.file:
+                self.file.write(json.dumps(asdict(op)) + "\n")
+                self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+@contextmanager
+def recording(history):
+    token = _history.set(history)
+    try:
+        yield history
+    finally:
+        _history.reset(token)
+
+
+def record(method, path, request_headers, status, response_headers, t0, t_end, body=None):
+    # Turns one object request into an operation. Rejected writes and reads
+    # that say nothing about the value (412, 5xx, no response) are left out.
+    # Of a multipart upload only the completion counts, as a write of the
+    # composite ETag from its XML body.
+    history = _history.get()
+    if history is None:
+        return
+    path, _, query = path.partition("?")
+    bucket, _, key = unquote(path).lstrip("/").partition("/")
+    if not key:
+        return
+    etag = (response_headers or {}).get("ETag", "").strip('"') or None
+    verb = method
+    if "uploadId" in query or "uploads" in query:
+        if method != "POST" or "uploadId" not in query:
+            return
+        match = re.search(rb"<ETag>(.*?)</ETag>", body or b"")
+        if status is not None and not match:
+            return
+        verb, etag = "PUT", match and html.unescape(match[1].decode()).strip('"')
+    if verb in ("PUT", "DELETE"):
+        kind = "write"
+        if status is None:
+            value = ANY if verb == "PUT" else None
+        elif 200 <= status < 300:
+            value = etag if verb == "PUT" else None
+        else:
+            return
+    elif verb in ("GET", "HEAD"):
+        kind = "read"
+        if status in (200, 304):
+            value = etag
+        elif status == 404:
+            value = None
+        else:
+            return
+    else:
+        return
+    history.append(Op(
+        key=f"{bucket}/{key}",
+        kind=kind,
+        value=value,
+        invoke_ns=t0,
+        complete_ns=t_end if status is not None else None,
+        method=method,
+        region=request_headers.get("X-Tigris-Regions") or "default",
+        consistent=request_headers.get("X-Tigris-Consistent", "").lower() == "true",
+        status=status,
+    ))
+
+
+def load(path):
+    with open(path) as f:
+        return [Op(**json.loads(line)) for line in f if line.strip()]
+
+
+# ---------- Checker ----------
+def _step(state, op):
+    # Register model: the states the object can be in after op, none if the
+    # op cannot be linearized from `state`.
+    if op.kind == "write":
+        return (op.value,) if op.complete_ns is not None else (op.value, state)
+    if state == op.value:
+        return (state,)
+    if state == ANY:
+        return (op.value,)
+    return ()
+
+
+def _by_key(ops):
+    keys = {}
+    for op in ops:
+        keys.setdefault(op.key, []).append(op)
+    return keys
+
+
+def _search(ops, initial=None):
+    # Wing & Gong search with Lowe's memoization, as in Porcupine, over one
+    # key's operations: walk the call/return events in time order, linearize
+    # any pending call whose result the model allows, and backtrack at the
+    # first return reached before its call was linearized. Configurations
+    # (linearized set, state) already explored are never explored again.
+    # Returns None if the history is linearizable, else the time of the
+    # latest return any branch got stuck at: no branch got past it.
+    ops = sorted(ops, key=lambda op: op.invoke_ns)
+    end = max((max(op.invoke_ns, op.complete_ns or 0) for op in ops), default=0) + 1
+    events = sorted(
+        [(op.invoke_ns, 0, i) for i, op in enumerate(ops)]
+        + [(end if op.complete_ns is None else op.complete_ns, 1, i) for i, op in enumerate(ops)]
+    )
+    # Doubly linked list of events; node 0 is the head, node n + 1 the tail.
+    n = len(events)
+    tail = n + 1
+    nxt = list(range(1, n + 2)) + [tail]
+    prev = [0] + list(range(0, n + 1))
+    op_of = [None] * (n + 2)
+    is_call = [False] * (n + 2)
+    match = [None] * (n + 2)
+    calls = {}
+    for node, (_, ret, i) in enumerate(events, 1):
+        op_of[node] = i
+        if ret:
+            match[calls[i]] = node
+        else:
+            is_call[node] = True
+            calls[i] = node
+
+    def lift(c):
+        r = match[c]
+        nxt[prev[c]], prev[nxt[c]] = nxt[c], prev[c]
+        nxt[prev[r]], prev[nxt[r]] = nxt[r], prev[r]
+
+    def unlift(c):
+        r = match[c]
+        prev[nxt[r]] = nxt[prev[r]] = r
+        prev[nxt[c]] = nxt[prev[c]] = c
+
+    def explored(linearized, state):
+        # Ops are numbered in call order and every call before the list's
+        # head is linearized, so the set is kept as the bits from the head's
+        # op up: small however long the history.
+        low = op_of[nxt[0]] if nxt[0] != tail else n
+        config = (low, linearized >> low, state)
+        if config in seen:
+            return True
+        seen.add(config)
+        return False
+
+    state, linearized = initial, 0
+    stack, seen = [], set()
+    stuck = None
+    entry = nxt[0]
+    while nxt[0] != tail:
+        if is_call[entry]:
+            op = ops[op_of[entry]]
+            bit = 1 << op_of[entry]
+            # A read of the current value changes nothing and can go first in
+            # any linearization that exists from here, so once it has been
+            # tried no other order of this configuration needs trying.
+            forced = op.kind == "read" and op.value == state != ANY
+            lifted = False
+            for candidate in _step(state, op):
+                lift(entry)
+                if not explored(linearized | bit, candidate):
+                    stack.append((entry, state, forced))
+                    state, linearized, lifted = candidate, linearized | bit, True
+                    break
+                unlift(entry)
+            if lifted:
+                entry = nxt[0]
+                continue
+            if not forced:
+                entry = nxt[entry]
+                continue
+        else:
+            t = events[entry - 1][0]
+            stuck = t if stuck is None else max(stuck, t)
+        while True:
+            if not stack:
+                return end if stuck is None else stuck
+            # Retry the popped call: its other candidate states, if any,
+            # are still unexplored; otherwise move past it.
+            entry, state, forced = stack.pop()
+            linearized &= ~(1 << op_of[entry])
+            unlift(entry)
+            if not forced:
+                break
+    return None
+
+
+def linearizable(ops, initial=None):
+    # A history of independent registers is linearizable if each key's
+    # sub-history is (locality), so every key is searched on its own.
+    return all(_search(key_ops, initial) is None for key_ops in _by_key(ops).values())
+
+
+def _cut(ops, t):
+    # The history as it stood at time t: what was invoked by then, writes
+    # still open as writes without a response, reads still open left out.
+    cut = {}
+    for op in ops:
+        if op.invoke_ns > t:
+            continue
+        if op.complete_ns is None or op.complete_ns <= t:
+            cut[id(op)] = op
+        elif op.kind == "write":
+            cut[id(op)] = replace(op, complete_ns=None)
+    return cut
+
+
+def _units(ops):
+    # Pieces a sub-history is shrunk by: each write together with the reads
+    # that returned its value (so no read is left unexplained), each other
+    # read on its own.
+    units, owner = [], {}
+    for op in sorted(ops, key=lambda op: op.invoke_ns):
+        if op.kind == "write" and op.value not in (None, ANY):
+            if op.value in owner:
+                owner[op.value].append(op)
+            else:
+                owner[op.value] = [op]
+                units.append(owner[op.value])
+    for op in sorted(ops, key=lambda op: op.invoke_ns):
+        if op.kind == "write" and op.value in (None, ANY):
+            units.append([op])
+        elif op.kind == "read":
+            if op.value in owner:
+                owner[op.value].append(op)
+            else:
+                units.append([op])
+    units.sort(key=lambda unit: min(op.invoke_ns for op in unit))
+    return units
+
+
+def _shrink(units, fails):
+    # Delta debugging: drop ever smaller runs of units while the rest still fails.
+    chunk = max(len(units) // 2, 1)
+    while True:
+        i = 0
+        while i < len(units):
+            trial = units[:i] + units[i + chunk:]
+            if trial and fails(trial):
+                units = trial
+            else:
+                i += chunk
+        if chunk == 1:
+            return units
+        chunk //= 2
+
+
+def minimize(ops, initial=None):
+    # Shrinks a non-linearizable history to a 1-minimal one over a single
+    # key: the history is first cut where the search got stuck (nothing
+    # after that can matter), then comes the shortest failing prefix of
+    # units, delta debugging over those, and over the reads left one by one.
+    # The result holds the original operations, which fail as well: a write
+    # the cut left open only gains a constraint back.
+    def fails(units):
+        return _search([op for unit in units for op in unit], initial) is not None
+
+    # Empty if the history is linearizable.
+    for key_ops in _by_key(ops).values():
+        stuck = _search(key_ops, initial)
+        if stuck is not None:
+            break
+    else:
+        return []
+    cut = _cut(key_ops, stuck)
+    units = _units(list(cut.values()))
+    lo, hi = 0, len(units)
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if fails(units[:mid]):
+            hi = mid
+        else:
+            lo = mid
+    ops = [op for unit in _shrink(units[:hi], fails) for op in unit]
+    writes = [[op] for op in ops if op.kind == "write"]
+    reads = _shrink([[op] for op in ops if op.kind == "read"], lambda trial: fails(writes + trial))
+    original = {id(op): op for op in key_ops}
+    kept = {id(op) for unit in writes + reads for op in unit}
+    return sorted((original[i] for i in cut if id(cut[i]) in kept), key=lambda op: op.invoke_ns)
+
+
+@dataclass
+class Result:
+    ops: int
+    keys: int
+    # key -> minimal violating sub-history
+    violations: dict
+    # reads that were checked; with none, a pass says nothing
+    reads: int = 0
+
+    @property
+    def ok(self):
+        return not self.violations
+
+
+def check(ops, consistent_only=True, initial=None):
+    # Reads without X-Tigris-Consistent are allowed to be stale, so by default
+    # only consistent reads are checked; every write is kept.
+    if consistent_only:
+        ops = [op for op in ops if op.kind == "write" or op.consistent]
+    keys = _by_key(ops)
+    violations = {}
+    for key, key_ops in keys.items():
+        violation = minimize(key_ops, initial)
+        if violation:
+            violations[key] = violation
+    return Result(ops=len(ops), keys=len(keys), violations=violations,
+                  reads=sum(op.kind == "read" for op in ops))
+
+
+def report(result):
+    if result.ok and not result.reads:
+        return f"Linearizability: NOT CHECKED (no reads to check among {result.ops} ops)"
+    lines = [f"Linearizability: {'PASS' if result.ok else 'FAIL'} "
+             f"({result.ops} ops, {result.reads} reads, over {result.keys} keys, {len(result.violations)} violating)"]
+    for key, ops in result.violations.items():
+        origin = min(op.invoke_ns for op in ops)
+        rows = [
+            [op.kind, op.method, op.region, "absent" if op.value is None else op.value[:12],
+             f"{(op.invoke_ns - origin) / 1e6:.2f}",
+             "-" if op.complete_ns is None else f"{(op.complete_ns - origin) / 1e6:.2f}"]
+            for op in ops
+        ]
+        lines.append(f"Minimal violating history for {key}:")
+        lines.append(tabulate(rows, headers=["Op", "Method", "Region", "Value", "Invoke (ms)", "Complete (ms)"],
+                              tablefmt="grid"))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check a recorded operation history for linearizability")
+    parser.add_argument("path")
+    parser.add_argument("--all", action="store_true", help="also check reads made without X-Tigris-Consistent")
+    args = parser.parse_args()
+    result = check(load(args.path), consistent_only=not args.all)
+    print(report(result))
+    raise SystemExit(0 if result.ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+import argparse
+import contextvars
+import csv
+import threading
+import time
+import uuid
+from array import array
+
+import requests
+from tabulate import tabulate
+
+from harness import cleanup, config, metrics, payload
+from harness.client import connect, xml_field, xml_fields
+from harness.histogram import Histogram
+from harness.sweep import parse_size
+
+
+def key_name(prefix, index):
+    # Zero-padded so listing order is write order.
+    return f"{prefix}{index:07d}"
+
+
+# ListObjectsV2's largest page
+PAGE = 1000
+
+
+class Index:
+    # What one region's listings have shown so far: when each key was first
+    # listed (0 while unseen, -1 if its write failed). `high` is the highest
+    # key listed so far and `missing` the keys below it still unseen, a
+    # sparse set: a round lists the gaps they leave and whatever comes after
+    # `high`, so one slow key never has every key after it listed again.
+
+    def __init__(self, count):
+        self.count = count
+        self.seen_ns = array("q", [0]) * count
+        self.seen = 0
+        self.pending = count
+        self.high = -1
+        self.missing = set()
+        self.lock = threading.Lock()
+        self.rounds = self.pages = self.listed = 0
+
+    @property
+    def done(self):
+        return not self.pending
+
+    def settle(self, index, t_ns):
+        if not self.seen_ns[index]:
+            self.seen_ns[index] = t_ns
+            self.pending -= 1
+        self.missing.discard(index)
+
+    def add(self, index, t_ns):
+        if not 0 <= index < self.count:
+            return
+        with self.lock:
+            if not self.seen_ns[index]:
+                self.seen += 1
+            self.settle(index, t_ns)
+            if index > self.high:
+                self.missing.update(i for i in range(self.high + 1, index) if not self.seen_ns[i])
+                self.high = index
+
+    def skip(self, indexes):
+        # Keys whose write failed: nothing to wait for.
+        with self.lock:
+            for index in indexes:
+                self.settle(index, -1)
+
+    def gaps(self):
+        # Runs of consecutive missing keys, as (first, last).
+        with self.lock:
+            missing = sorted(self.missing)
+        runs = []
+        for i in missing:
+            if runs and runs[-1][1] == i - 1:
+                runs[-1][1] = i
+            else:
+                runs.append([i, i])
+        return runs
+
+
+def list_pages(client, prefix, index, region, consistent, after, max_keys=PAGE, pages=None):
+    # Lists the prefix from after key `after` (-1: from the start), up to
+    # `pages` pages or to its end; a key counts as visible when its page
+    # arrived.
+    start_after = key_name(prefix, after) if after >= 0 else None
+    token = None
+    while True:
+        resp = client.list_objects(prefix, token, None if token else start_after, max_keys, region=region,
+                                   consistent=consistent)
+        if resp.status_code != 200:
+            return
+        keys = xml_fields(resp.text, "Key")
+        index.pages += 1
+        index.listed += len(keys)
+        for key in keys:
+            index.add(int(key[len(prefix):]), resp.acked_ns)
+        token = xml_field(resp.text, "NextContinuationToken")
+        if xml_field(resp.text, "IsTruncated") != "true" or not token:
+            return
+        if pages is not None:
+            pages -= 1
+            if not pages:
+                return
+
+
+def list_round(client, prefix, index, region, consistent):
+    # One page just wide enough for each gap, then everything after the
+    # highest key seen; when the gaps are dense, one pass from the first gap
+    # on costs fewer pages.
+    index.rounds += 1
+    gaps = index.gaps()
+    if gaps and len(gaps) > (index.high - gaps[0][0]) // PAGE + 1:
+        list_pages(client, prefix, index, region, consistent, gaps[0][0] - 1)
+        return
+    for first, last in gaps:
+        list_pages(client, prefix, index, region, consistent, first - 1, min(last - first + 1, PAGE), 1)
+    list_pages(client, prefix, index, region, consistent, index.high)
+
+
+def watch(client, prefix, index, region, consistent, interval, written, stop, timeout):
+    # Lists until every key is visible, `timeout` seconds after the writes
+    # finished, or until stopped.
+    deadline = None
+    while not index.done and not stop.is_set():
+        try:
+            list_round(client, prefix, index, region, consistent)
+        except requests.RequestException as e:
+            print(f"List from {region or 'default'} failed: {e}")
+        if written.is_set():
+            deadline = deadline or time.perf_counter_ns() + int(timeout * 1e9)
+            if time.perf_counter_ns() > deadline:
+                return
+        stop.wait(interval)
+
+
+def write_keys(client, prefix, count, size, region, consistent, writers, acked_ns, stop, failed=None):
+    # `writers` threads PUT keys in order off one shared counter until every
+    # key is written or `stop` is set; failed(i) is called as soon as key i's
+    # PUT fails.
+    pending = iter(range(count))
+
+    def writer():
+        for i in pending:
+            if stop.is_set():
+                return
+            try:
+                resp = client.put(key_name(prefix, i), payload.new(size), region, consistent)
+            except requests.RequestException:
+                resp = None
+            if resp is not None and resp.status_code == 200:
+                acked_ns[i] = resp.acked_ns
+            elif failed:
+                failed(i)
+
+    threads = [threading.Thread(target=contextvars.copy_context().run, args=(writer,)) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    finally:
+        # Interrupted: the writers stop after their current PUT.
+        if any(thread.is_alive() for thread in threads):
+            stop.set()
+        for thread in threads:
+            thread.join()
+
+
+def new_prefix():
+    # Every run writes under a prefix of its own, which is also what its
+    # cleanup lists: an interrupted run never learns which keys it wrote.
+    return f"list-visibility-{uuid.uuid4()}/"
+
+
+def run(client, prefix, count, size, put_region, read_regions, consistent=False, writers=8, interval=0.05,
+        timeout=600.0):
+    # Writes `count` keys under `prefix` from `put_region` while every read
+    # region lists it; returns (write acks, {region: Index}).
+    acked_ns = array("q", [0]) * count
+    indexes = {region: Index(count) for region in read_regions}
+
+    def failed(i):
+        for index in indexes.values():
+            index.skip([i])
+
+    written, stop = threading.Event(), threading.Event()
+    listers = [
+        threading.Thread(target=contextvars.copy_context().run,
+                         args=(watch, client, prefix, indexes[region], region, consistent, interval, written, stop,
+                               timeout))
+        for region in read_regions
+    ]
+    for lister in listers:
+        lister.start()
+    try:
+        write_keys(client, prefix, count, size, put_region, consistent, writers, acked_ns, stop, failed)
+        written.set()
+    finally:
+        if not written.is_set():
+            stop.set()
+        for lister in listers:
+            lister.join()
+    return acked_ns, indexes
+
+
+def report(acked_ns, indexes):
+    written = sum(1 for t in acked_ns if t)
+    rows = []
+    for region, index in indexes.items():
+        histogram = Histogram()
+        for ack, seen in zip(acked_ns, index.seen_ns):
+            if ack and seen:
+                histogram.record(max(seen - ack, 0))
+        quantiles = [histogram.quantile(q) for q in (0.5, 0.9, 0.99, 0.999, 1.0)]
+        rows.append([region or "default", index.seen, written - len(histogram)]
+                    + ["-" if q is None else f"{q / 1e6:.2f}" for q in quantiles]
+                    + [index.rounds, index.pages, f"{index.listed / max(written, 1):.2f}"])
+    headers = ["Region", "Seen", "Missing", "p50 (ms)", "p90 (ms)", "p99 (ms)", "p99.9 (ms)", "max (ms)",
+               "Rounds", "Pages", "Listed/key"]
+    print(f"{written}/{len(acked_ns)} keys written; visibility in listings after each key's PUT ack:")
+    print(tabulate(rows, headers=headers, tablefmt="grid"))
+
+
+def save(path, prefix, acked_ns, indexes):
+    # One row per key and region: nanoseconds from the PUT ack to the first
+    # listing that showed it (empty if it never did).
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["key", "region", "visible_ns"])
+        for region, index in indexes.items():
+            for i, (ack, seen) in enumerate(zip(acked_ns, index.seen_ns)):
+                if ack:
+                    writer.writerow([key_name(prefix, i), region or "default", max(seen - ack, 0) if seen else ""])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure when newly written keys show up in ListObjectsV2")
+    parser.add_argument("--keys", type=int, default=1000, help="keys written under one fresh prefix (up to 100k)")
+    parser.add_argument("--size", type=parse_size, default=0, help="object size")
+    parser.add_argument("--put-region", default="sjc")
+    parser.add_argument("--read-regions", default="default", help='comma-separated; "default" is the default replica')
+    parser.add_argument("--consistent", action="store_true")
+    parser.add_argument("--writers", type=int, default=config.pool_size, help="PUTs in flight at once")
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between listing rounds")
+    parser.add_argument("--timeout", type=float, default=600.0, help="seconds to keep listing after the last write")
+    parser.add_argument("--out", help="CSV of per-key visibility latencies")
+    args = parser.parse_args()
+    read_regions = [None if r in ("", "default") else r for r in args.read_regions.split(",")]
+    put_region = None if args.put_region == "default" else args.put_region
+    metrics.serve()
+    client = connect()
+    prefix = new_prefix()
+    try:
+        client.warm(dict.fromkeys([put_region, *read_regions]))
+        acked_ns, indexes = run(client, prefix, args.keys, args.size, put_region, read_regions, args.consistent,
+                                args.writers, args.interval, args.timeout)
+        report(acked_ns, indexes)
+        if args.out:
+            save(args.out, prefix, acked_ns, indexes)
+    finally:
+        try:
+            cleanup.after_prefix(prefix, client)
+        finally:
+            client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from harness import config
+
+# Histogram bucket bounds in seconds, shared by every histogram
+BOUNDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+          300.0, 600.0)
+
+HELP = {
+    "harness_requests": ("counter", "Requests by method, region and status (\"error\" when no response arrived)"),
+    "harness_iterations": ("counter", "Finished iterations by scenario and status"),
+    "harness_timeouts": ("counter", "Iterations that did not converge within max_poll_seconds"),
+    "harness_mismatches": ("counter", "Iterations whose content did not match what was written"),
+    "harness_request_duration_seconds": ("histogram", "Request time from send to the end of the body"),
+    "harness_convergence_seconds": ("histogram", "Convergence time of passing iterations"),
+}
+
+enabled = bool(config.metrics_port)
+
+
+class Shard:
+    # The metrics one thread recorded. Only its thread writes to it, so
+    # recording takes no lock; a scrape copies it under the GIL.
+    __slots__ = ("thread", "counters", "histograms")
+
+    def __init__(self, thread=None):
+        self.thread = thread
+        self.counters = {}
+        # (name, labels) -> [count per bucket ..., count above the last bound, sum]
+        self.histograms = {}
+
+    def merge(self, other):
+        for key, value in other.counters.copy().items():
+            self.counters[key] = self.counters.get(key, 0) + value
+        for key, buckets in other.histograms.copy().items():
+            mine = self.histograms.setdefault(key, [0] * (len(BOUNDS) + 1) + [0.0])
+            for i, value in enumerate(list(buckets)):
+                mine[i] += value
+
+
+_local = threading.local()
+_shards = []
+# Guards _shards, taken once per thread and by scrapes; never while recording.
+_shards_lock = threading.Lock()
+# What threads that have exited recorded
+_retired = Shard()
+_server = None
+
+
+def _shard():
+    try:
+        return _local.shard
+    except AttributeError:
+        shard = _local.shard = Shard(threading.current_thread())
+        with _shards_lock:
+            _shards.append(shard)
+        return shard
+
+
+def _count(name, labels, n=1):
+    counters = _shard().counters
+    key = (name, labels)
+    counters[key] = counters.get(key, 0) + n
+
+
+def _observe(name, labels, seconds):
+    histograms = _shard().histograms
+    buckets = histograms.get((name, labels))
+    if buckets is None:
+        buckets = histograms[(name, labels)] = [0] * (len(BOUNDS) + 1) + [0.0]
+    buckets[bisect.bisect_left(BOUNDS, seconds)] += 1
+    buckets[-1] += seconds
+
+
+def request(method, region, status, seconds):
+    if not enabled:
+        return
+    _count("harness_requests", (("method", method), ("region", region or "default"), ("status", str(status))))
+    if status != "error":
+        _observe("harness_request_duration_seconds", (("method", method), ("region", region or "default")), seconds)
+
+
+def iteration(record):
+    if not enabled:
+        return
+    scenario = (("scenario", record.scenario),)
+    _count("harness_iterations", scenario + (("status", record.status),))
+    if record.note == "TIMEOUT":
+        _count("harness_timeouts", scenario)
+    if record.status == "MISMATCH":
+        _count("harness_mismatches", scenario)
+    if record.status == "PASS" and record.convergence_ns is not None:
+        _observe("harness_convergence_seconds", scenario, record.convergence_ns / 1e9)
+
+
+def snapshot():
+    # Every shard merged; shards of threads that have exited fold into _retired.
+    with _shards_lock:
+        for shard in [s for s in _shards if not s.thread.is_alive()]:
+            _shards.remove(shard)
+            _retired.merge(shard)
+        total = Shard()
+        for shard in [_retired, *_shards]:
+            total.merge(shard)
+    return total
+
+
+def _labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def exposition(openmetrics=False):
+    # Prometheus text format, or OpenMetrics when the scraper asks for it.
+    total = snapshot()
+    lines = []
+    for name, (kind, help) in HELP.items():
+        family = name if openmetrics or kind != "counter" else f"{name}_total"
+        lines.append(f"# HELP {family} {help}")
+        lines.append(f"# TYPE {family} {kind}")
+        if kind == "counter":
+            for (metric, labels), value in sorted(total.counters.items()):
+                if metric == name:
+                    lines.append(f"{name}_total{_labels(labels)} {value}")
+            continue
+        for (metric, labels), buckets in sorted(total.histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip([*BOUNDS, "+Inf"], buckets):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {buckets[-1]}")
+    if openmetrics:
+        lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+        body = exposition(openmetrics).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8" if openmetrics
+                         else "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve():
+    # Starts the /metrics endpoint when METRICS_PORT is set; safe to call
+    # from every entry point, only the first call binds.
+    global _server
+    if not enabled or _server is not None:
+        return _server
+    _server = ThreadingHTTPServer((config.metrics_host, config.metrics_port), Handler)
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    print(f"Metrics at http://{config.metrics_host}:{_server.server_address[1]}/metrics")
+    return _server
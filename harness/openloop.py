@@ -0,0 +1,142 @@
+import argparse
+import asyncio
+import itertools
+import time
+
+import aiohttp
+from tabulate import tabulate
+
+from harness import cleanup, config, metrics, results, timing
+from harness.aio import open_client, run_iteration
+from harness.engine import new_record
+from harness.histogram import Histogram
+from harness.scenarios import SCENARIOS
+
+MUTATIONS = ("PUT", "POST", "DELETE")
+
+
+def observe(histograms, record):
+    # Everything is measured from when the iteration was due (the trace
+    # origin), not from when its first request went out: if the client falls
+    # behind, the wait shows up in the latencies instead of being omitted.
+    if not record.trace:
+        return
+    histograms["lag"].record(record.trace[0]["start_ns"])
+    writes = [e for e in record.trace if e["method"] in MUTATIONS]
+    if writes:
+        histograms["write"].record(max(e["start_ns"] + e["total_ns"] for e in writes))
+    if record.status == "PASS":
+        histograms["convergence"].record(record.trace[0]["start_ns"] + record.convergence_ns)
+
+
+async def run_rate(client, scenario, sink, rate, duration, in_flight, runs, size=None):
+    # Starts an iteration every 1/rate seconds whether or not earlier ones
+    # have finished; at most `in_flight` run at once, the rest queue (and
+    # their wait counts against them).
+    histograms = {name: Histogram() for name in ("lag", "write", "convergence")}
+    records = []
+    semaphore = asyncio.Semaphore(in_flight)
+    interval = 1e9 / rate
+    start = time.perf_counter_ns()
+
+    async def one(due):
+        async with semaphore:
+            record = new_record(scenario, next(runs), size)
+            try:
+                with timing.recording(record.trace, due):
+                    await run_iteration(client, scenario, record)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                record.fail(str(e), "ERROR")
+        sink.write(record)
+        records.append(record)
+        observe(histograms, record)
+
+    tasks = []
+    for i in range(max(int(rate * duration), 1)):
+        due = start + int(i * interval)
+        delay = due - time.perf_counter_ns()
+        if delay > 0:
+            await asyncio.sleep(delay / 1e9)
+        tasks.append(asyncio.create_task(one(due)))
+    await asyncio.gather(*tasks)
+    elapsed = (time.perf_counter_ns() - start) / 1e9
+    return {
+        "rate": rate,
+        "achieved": len(records) / elapsed,
+        "runs": len(records),
+        "fail": sum(r.status != "PASS" for r in records),
+        "histograms": histograms,
+    }
+
+
+async def sweep(scenario, sink, rate, max_rate, factor, duration, threshold_ms, in_flight, max_fail=0.01):
+    # Raises the rate geometrically until convergence p99 passes the
+    # threshold or more than `max_fail` of iterations fail.
+    client = await open_client(scenario, in_flight)
+    runs = itertools.count()
+    steps = []
+    try:
+        while rate <= max_rate:
+            print(f"Rate {rate:.2f}/s for {duration:g} s")
+            step = await run_rate(client, scenario, sink, rate, duration, in_flight, runs)
+            steps.append(step)
+            p99 = step["histograms"]["convergence"].quantile(0.99)
+            if step["fail"] > max_fail * step["runs"] or p99 is None or p99 / 1e6 > threshold_ms:
+                step["saturated"] = True
+                break
+            rate *= factor
+    finally:
+        await client.close()
+    return steps
+
+
+def report(steps, threshold_ms):
+    def q(histogram, quantile):
+        value = histogram.quantile(quantile)
+        return "-" if value is None else f"{value / 1e6:.2f}"
+
+    rows = []
+    for step in steps:
+        h = step["histograms"]
+        rows.append(
+            [f"{step['rate']:.2f}", f"{step['achieved']:.2f}", step["runs"], step["fail"]]
+            + [q(h["convergence"], quantile) for quantile in (0.5, 0.9, 0.99, 1.0)]
+            + [q(h["write"], 0.99), q(h["lag"], 0.99)]
+        )
+    headers = ["Target/s", "Achieved/s", "Runs", "Fail", "Conv p50 (ms)", "Conv p90 (ms)", "Conv p99 (ms)",
+               "Conv max (ms)", "Write p99 (ms)", "Lag p99 (ms)"]
+    print(tabulate(rows, headers=headers, tablefmt="grid"))
+    saturated = [step for step in steps if step.get("saturated")]
+    if saturated:
+        last_ok = steps[-2]["rate"] if len(steps) > 1 else None
+        print(f"Saturated at {saturated[0]['rate']:.2f}/s (p99 over {threshold_ms:g} ms or too many failures); "
+              f"last rate within bounds: {'none' if last_ok is None else f'{last_ok:.2f}/s'}")
+    else:
+        print(f"No saturation up to {steps[-1]['rate']:.2f}/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop rate sweep for a scenario")
+    parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("--rate", type=float, default=1.0, help="starting iterations/s")
+    parser.add_argument("--max-rate", type=float, default=1000.0)
+    parser.add_argument("--factor", type=float, default=1.5, help="rate multiplier per step")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per rate step")
+    parser.add_argument("--p99", type=float, default=1000.0, help="convergence p99 threshold in ms")
+    parser.add_argument("--in-flight", type=int, default=256, help="iterations allowed in flight at once")
+    args = parser.parse_args()
+    scenario = SCENARIOS[args.scenario]
+    metrics.serve()
+    print(scenario.title)
+    sink = results.open_sink(config.results)
+    try:
+        steps = asyncio.run(sweep(scenario, sink, args.rate, args.max_rate, args.factor, args.duration,
+                                  args.p99, args.in_flight))
+    finally:
+        sink.close()
+        cleanup.after_run([r.key for r in sink.records])
+    report(steps, args.p99)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import hashlib
+import random
+
+from harness import config, sigv4, verify
+
+# Draws per-payload seeds; set SEED to make a run's content reproducible.
+_seeds = random.Random(config.seed)
+# bytes of SHAKE output drawn per call
+BLOCK = 64 * 1024
+
+
+class Payload:
+    # Pseudo-random content regenerated on demand from (seed, size), one chunk
+    # at a time, so it never touches disk or sits in memory as a whole.
+
+    # whether hashing up front may keep the chunks (see digest)
+    cacheable = True
+
+    def __init__(self, seed, size, chunk_size=verify.chunk_size):
+        self.seed = seed
+        self.size = size
+        self.chunk_size = chunk_size
+        self._digest = None
+        self._cache = None
+
+    def chunk(self, index):
+        # Full-entropy content, nothing for a store or transport to compress
+        # or dedupe: SHAKE-128 in counter mode over (seed, chunk, block).
+        # Squeezing SHAKE holds the GIL, so it is drawn a block at a time
+        # rather than a chunk at once, letting other threads in between.
+        n = min(self.chunk_size, self.size - index * self.chunk_size)
+        prefix = self.seed.to_bytes(8, "big") + index.to_bytes(8, "big")
+        return b"".join(
+            hashlib.shake_128(prefix + block.to_bytes(4, "big")).digest(min(BLOCK, n - block * BLOCK))
+            for block in range(-(-n // BLOCK))
+        )
+
+    def __iter__(self):
+        return self.chunks()
+
+    def chunks(self, start=0):
+        if self._cache is not None:
+            yield from self._cache[start:]
+            return
+        for index in range(start, -(-self.size // self.chunk_size)):
+            yield self.chunk(index)
+
+    def stream(self):
+        # The chunks in order, hashed on their way out unless the digest is
+        # already known, so uploads that don't sign it up front never
+        # generate the content twice. An upload cut short leaves it unset.
+        h = None if self._digest else hashlib.sha256()
+        for chunk in self.chunks():
+            if h:
+                h.update(chunk)
+            yield chunk
+        if h:
+            self._digest = h.hexdigest()
+
+    def framed(self, signer):
+        # aws-chunked body: every chunk signed by `signer`, then the final empty one.
+        for chunk in self.stream():
+            yield signer.frame(chunk)
+        yield signer.frame(b"")
+
+    def framed_length(self):
+        sizes = [self.chunk_size] * (self.size // self.chunk_size) + [self.size % self.chunk_size]
+        return sigv4.framed_length([s for s in sizes if s])
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def digest(self):
+        if self._digest is None:
+            # Small payloads keep their chunks, so the upload that needed the
+            # digest first doesn't generate them again.
+            if self.cacheable and self.size <= config.payload_cache_bytes:
+                self._cache = list(self.chunks())
+            self._digest = verify.stream_digest(self.chunks())
+        return self._digest
+
+    def reader(self, signer=None):
+        if signer:
+            return Reader(self.framed(signer), self.framed_length())
+        return Reader(self.stream(), self.size)
+
+    def parts(self, part_size):
+        # Multipart upload parts, numbered from 1; part_size is rounded down
+        # to whole chunks so every part starts on a chunk boundary.
+        part_size = max(part_size // self.chunk_size, 1) * self.chunk_size
+        return [Part(self, number, part_size) for number in range(1, -(-self.size // part_size) + 1)]
+
+
+class Part(Payload):
+    # One part of a payload, itself a payload over the parent's chunks. Parts
+    # never keep their chunks: a multipart upload holds every part until it
+    # completes, so cached parts would add up to the whole object.
+
+    cacheable = False
+
+    def __init__(self, payload, number, part_size):
+        offset = (number - 1) * part_size
+        super().__init__(payload.seed, min(part_size, payload.size - offset), payload.chunk_size)
+        self.parent = payload
+        self.number = number
+        self.first = offset // payload.chunk_size
+
+    def chunk(self, index):
+        return self.parent.chunk(self.first + index)
+
+
+class Reader:
+    # File-like view over a stream of blocks for HTTP clients that read(n)
+    # from the body and size it with len().
+
+    def __init__(self, blocks, length):
+        self.chunks = iter(blocks)
+        self.current = b""
+        self.offset = 0
+        self.remaining = length
+
+    def __len__(self):
+        return self.remaining
+
+    def prime(self):
+        # Generate the first chunk now rather than when the upload starts.
+        if not self.current:
+            self.current = next(self.chunks, b"")
+            self.offset = 0
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            n = self.remaining
+        out = []
+        while n > 0:
+            if self.offset >= len(self.current):
+                self.current = next(self.chunks, b"")
+                self.offset = 0
+                if not self.current:
+                    break
+            piece = self.current[self.offset:self.offset + n]
+            self.offset += len(piece)
+            n -= len(piece)
+            out.append(piece)
+        data = b"".join(out)
+        self.remaining -= len(data)
+        return data
+
+
+def new(size):
+    return Payload(_seeds.getrandbits(64), size)
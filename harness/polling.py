@@ -0,0 +1,49 @@
+import random
+
+from harness import config
+
+
+class Fixed:
+    # The original behaviour: one probe every poll_interval seconds.
+
+    def __init__(self, interval):
+        self.interval = interval
+
+    def delay(self, elapsed):
+        return self.interval
+
+
+class Adaptive:
+    # Probes every `initial` seconds for the first `dense` seconds after the
+    # write, where most same-region convergence happens, then backs off
+    # geometrically up to `cap` with +/- `jitter` so probes don't synchronise.
+
+    def __init__(self, initial=0.002, dense=0.05, factor=1.5, cap=5.0, jitter=0.2, rng=random):
+        self.initial = initial
+        self.dense = dense
+        self.factor = factor
+        self.cap = cap
+        self.jitter = jitter
+        self.rng = rng
+        self.current = initial
+
+    def delay(self, elapsed):
+        if elapsed < self.dense:
+            return self.initial
+        self.current = min(self.current * self.factor, self.cap)
+        return self.current * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+STRATEGIES = {
+    "fixed": lambda scenario: Fixed(scenario.poll_interval),
+    "adaptive": lambda scenario: Adaptive(
+        initial=config.poll_initial_interval,
+        dense=config.poll_dense_seconds,
+        cap=config.poll_max_interval,
+    ),
+}
+
+
+def for_scenario(scenario, name=None):
+    # A fresh schedule per iteration; strategies keep backoff state.
+    return STRATEGIES[name or config.polling](scenario)
@@ -0,0 +1,284 @@
+import csv
+import dataclasses
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+from tabulate import tabulate
+
+from harness import metrics
+
+
+@dataclass
+class Record:
+    scenario: str
+    run: int
+    key: str
+    put_regions: list
+    read_regions: list
+    size: int
+    consistent: bool
+    # PASS, FAIL, MISMATCH or ERROR; note says why a run failed
+    status: str = "FAIL"
+    note: str = ""
+    attempts: int = None
+    # perf_counter nanoseconds from the first probe returning
+    convergence_ns: int = None
+    last_stale_ns: int = None
+    winner: str = None
+    started_at: float = field(default_factory=time.time)
+    # concurrent writers: send/ack per region from the first send, and the
+    # spread between first and last send
+    writes: list = field(default_factory=list)
+    skew_ns: int = None
+    # multipart scenarios: part count and initiate-to-complete upload time
+    parts: int = None
+    upload_ns: int = None
+    # distributed runs: each reader agent's probes relative to the write ack,
+    # and the bound on how far the agents' clocks may disagree
+    reads: list = field(default_factory=list)
+    clock_error_ns: int = None
+    # harness.scheduler: from the write ack to the first probe returning,
+    # which includes the time the key waited in the scheduler's heap
+    first_probe_ns: int = None
+    # every request the iteration made, with phase timings (see harness.timing)
+    trace: list = field(default_factory=list)
+
+    @classmethod
+    def for_scenario(cls, scenario, run, key, size):
+        return cls(
+            scenario=scenario.name,
+            run=run,
+            key=key,
+            put_regions=[r or "default" for r in scenario.put_regions],
+            read_regions=[r or "default" for r in scenario.read_regions],
+            size=size,
+            consistent=scenario.consistent,
+        )
+
+    def fail(self, note, status="FAIL"):
+        self.status = status
+        self.note = note
+        return self
+
+
+FIELDS = [f.name for f in dataclasses.fields(Record)]
+
+
+class JsonlSink:
+
+    def __init__(self, path):
+        self.file = open(path, "a")
+
+    def write(self, record):
+        self.file.write(json.dumps(dataclasses.asdict(record)) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class CsvSink:
+
+    def __init__(self, path):
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "a", newline="")
+        self.writer = csv.DictWriter(self.file, FIELDS)
+        if new:
+            self.writer.writeheader()
+
+    def write(self, record):
+        row = dataclasses.asdict(record)
+        row["put_regions"] = ",".join(row["put_regions"])
+        row["read_regions"] = ",".join(row["read_regions"])
+        row["writes"] = json.dumps(row["writes"])
+        row["reads"] = json.dumps(row["reads"])
+        row["trace"] = json.dumps(row["trace"])
+        self.writer.writerow(row)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class RotatingSink:
+    # Compact records (no trace) for runs that never end: a new file every
+    # `period` seconds, named after its start time, keeping the last `keep`.
+
+    def __init__(self, directory, period=3600, keep=168):
+        self.directory = directory
+        self.period = period
+        self.keep = keep
+        self.file = None
+        self.opened = None
+        os.makedirs(directory, exist_ok=True)
+
+    def rotate(self, now):
+        if self.file:
+            self.file.close()
+        self.opened = now - now % self.period
+        name = time.strftime("results-%Y%m%dT%H%M%S.jsonl", time.gmtime(self.opened))
+        self.file = open(os.path.join(self.directory, name), "a")
+        old = sorted(n for n in os.listdir(self.directory) if n.startswith("results-"))
+        for stale in old[:max(len(old) - self.keep, 0)]:
+            os.remove(os.path.join(self.directory, stale))
+
+    def write(self, record):
+        metrics.iteration(record)
+        now = time.time()
+        if self.file is None or now >= self.opened + self.period:
+            self.rotate(now)
+        compact = {k: v for k, v in dataclasses.asdict(record).items() if k != "trace"}
+        self.file.write(json.dumps(compact, separators=(",", ":")) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+class Sink:
+    # Appends every record to each file as soon as its iteration finishes, so
+    # a crashed run keeps everything it measured, and keeps them for the report.
+
+    def __init__(self, paths=()):
+        self.sinks = [CsvSink(p) if p.endswith(".csv") else JsonlSink(p) for p in paths]
+        self.records = []
+        self.lock = threading.Lock()
+
+    def write(self, record):
+        metrics.iteration(record)
+        with self.lock:
+            self.records.append(record)
+            for sink in self.sinks:
+                sink.write(record)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+def open_sink(spec):
+    return Sink([p.strip() for p in spec.split(",") if p.strip()])
+
+
+def load(path):
+    with open(path) as f:
+        if path.endswith(".csv"):
+            rows = list(csv.DictReader(f))
+            for row in rows:
+                for name in ("run", "size", "attempts", "convergence_ns", "last_stale_ns", "skew_ns", "parts",
+                             "upload_ns", "clock_error_ns", "first_probe_ns"):
+                    row[name] = int(row[name]) if row[name] else None
+                row["put_regions"] = row["put_regions"].split(",")
+                row["read_regions"] = row["read_regions"].split(",")
+                row["consistent"] = row["consistent"] == "True"
+                row["started_at"] = float(row["started_at"])
+                row["winner"] = row["winner"] or None
+                row["writes"] = json.loads(row["writes"]) if row["writes"] else []
+                row["reads"] = json.loads(row["reads"]) if row["reads"] else []
+                row["trace"] = json.loads(row["trace"]) if row["trace"] else []
+            return [Record(**row) for row in rows]
+        return [Record(**json.loads(line)) for line in f if line.strip()]
+
+
+# ---------- Summary ----------
+def quantile(ordered, q):
+    # Linear interpolation between closest ranks.
+    if not ordered:
+        return None
+    pos = (len(ordered) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+QUANTILES = [("min", 0.0), ("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0)]
+
+
+def summarize(records):
+    groups = {}
+    for record in records:
+        groups.setdefault(record.scenario, []).append(record)
+    summary = []
+    for name, group in groups.items():
+        times = sorted(r.convergence_ns for r in group if r.status == "PASS")
+        row = {
+            "scenario": name,
+            "runs": len(group),
+            "pass": sum(r.status == "PASS" for r in group),
+            "fail": sum(r.status != "PASS" for r in group),
+        }
+        for label, q in QUANTILES:
+            value = quantile(times, q)
+            row[label] = None if value is None else value / 1e6
+        summary.append(row)
+    return summary
+
+
+# ---------- Renderers ----------
+def ms(ns):
+    return f"{ns / 1e6:.2f} ms"
+
+
+def grid(records, winners=False):
+    rows = []
+    for r in records:
+        if r.convergence_ns is not None:
+            elapsed = ms(r.convergence_ns)
+            window = f"{r.last_stale_ns / 1e6:.2f}-{r.convergence_ns / 1e6:.2f} ms"
+        else:
+            elapsed, window = r.note or "-", "-"
+        row = [f"Run {r.run}", elapsed, window, "-" if r.attempts is None else r.attempts]
+        if winners:
+            row.append(r.winner or ("Unknown" if r.status != "FAIL" else "N/A"))
+            row.append("-" if r.skew_ns is None else ms(r.skew_ns))
+        rows.append(row + [r.status])
+    headers = ["Iteration", "Convergence Time", "Window", "Attempts", "Status"]
+    if winners:
+        headers[4:4] = ["Winner", "Write Skew"]
+    return tabulate(rows, headers=headers, tablefmt="grid")
+
+
+def winners_table(records):
+    # How often each region won, and how often the winner was the writer
+    # whose PUT left last (what last-writer-wins predicts), against skew.
+    groups = {}
+    for r in records:
+        if r.winner and r.writes:
+            groups.setdefault(r.winner, []).append(r)
+    rows = []
+    for winner, group in sorted(groups.items()):
+        skews = sorted(r.skew_ns for r in group)
+        last = sum(r.writes[-1]["region"] == winner for r in group)
+        rows.append([winner, len(group), last, f"{quantile(skews, 0.5) / 1e6:.2f}", f"{skews[-1] / 1e6:.2f}"])
+    headers = ["Winner", "Runs", "Last Sender Won", "p50 Skew (ms)", "max Skew (ms)"]
+    return tabulate(rows, headers=headers, tablefmt="grid")
+
+
+def upload_table(records):
+    # Multipart upload throughput next to the convergence it was followed by.
+    uploads = [r for r in records if r.upload_ns]
+    rates = sorted(r.size / (r.upload_ns / 1e9) / 2 ** 20 for r in uploads)
+    rows = [[
+        len(uploads),
+        uploads[0].parts if uploads else "-",
+        "-" if not rates else f"{rates[0]:.1f}",
+        "-" if not rates else f"{quantile(rates, 0.5):.1f}",
+        "-" if not rates else f"{rates[-1]:.1f}",
+        "-" if not uploads else ms(quantile(sorted(r.upload_ns for r in uploads), 0.5)),
+    ]]
+    headers = ["Uploads", "Parts", "min MiB/s", "p50 MiB/s", "max MiB/s", "p50 Upload"]
+    return tabulate(rows, headers=headers, tablefmt="grid")
+
+
+def summary_table(records):
+    rows = [
+        [s["scenario"], s["runs"], s["pass"], s["fail"]]
+        + ["-" if s[label] is None else f"{s[label]:.2f}" for label, _ in QUANTILES]
+        for s in summarize(records)
+    ]
+    headers = ["Scenario", "Runs", "Pass", "Fail"] + [f"{label} (ms)" for label, _ in QUANTILES]
+    return tabulate(rows, headers=headers, tablefmt="grid")
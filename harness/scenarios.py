@@ -0,0 +1,185 @@
+from dataclasses import dataclass
+
+from harness import config
+
+
+@dataclass
+class Scenario:
+    name: str
+    title: str
+    # "write", "overwrite", "delete" or "concurrent"
+    op: str
+    key_prefix: str
+    # regions the object is written from; None routes to the default replica
+    put_regions: tuple = (None,)
+    # regions polled for convergence
+    read_regions: tuple = (None,)
+    consistent: bool = False
+    probe: str = "HEAD"
+    poll_interval: float = 0.1
+    max_poll_seconds: float = 5
+    stop_on_timeout: bool = False
+    # object size; None uses FILE_SIZE_BYTES
+    size: int = None
+    # upload through multipart in parts of this size; None is a single PUT
+    part_size: int = None
+    # labels for selecting scenarios from the suite runner (python3 -m harness)
+    tags: tuple = ()
+
+    def regions(self):
+        return tuple(dict.fromkeys(self.put_regions + self.read_regions))
+
+
+SCENARIOS = {}
+
+
+def register(scenario):
+    SCENARIOS[scenario.name] = scenario
+    return scenario
+
+
+register(Scenario(
+    name="write-same-region",
+    title="Write and immediately read the same object in the same region",
+    op="write",
+    key_prefix="consistency-test",
+    put_regions=("sjc",),
+    read_regions=("sjc",),
+    max_poll_seconds=5,
+    tags=("same-region",),
+))
+register(Scenario(
+    name="overwrite-same-region",
+    title="Overwrite an object and read immediately from the same region",
+    op="overwrite",
+    key_prefix="overwrite-test",
+    put_regions=("sjc",),
+    read_regions=("sjc",),
+    max_poll_seconds=5,
+    tags=("same-region",),
+))
+register(Scenario(
+    name="delete-same-region",
+    title="Delete object and read immediately from same region",
+    op="delete",
+    key_prefix="delete-test",
+    put_regions=("fra",),
+    read_regions=("fra",),
+    max_poll_seconds=1,
+    tags=("same-region",),
+))
+register(Scenario(
+    name="write-cross-region",
+    title="Write Object in Region A and Immediately Read from Region B",
+    op="write",
+    key_prefix="global-replication-test",
+    put_regions=("sjc",),
+    max_poll_seconds=60,
+    tags=("cross-region",),
+))
+register(Scenario(
+    name="overwrite-cross-region",
+    title="Overwrite Object in Region A and Read from Region B",
+    op="overwrite",
+    key_prefix="overwrite-cross-region-test",
+    put_regions=("sjc",),
+    max_poll_seconds=60,
+    tags=("cross-region",),
+))
+register(Scenario(
+    name="delete-cross-region",
+    title="Delete Object in Region A and Read from Region B",
+    op="delete",
+    key_prefix="delete-cross-region-test",
+    put_regions=("sjc",),
+    max_poll_seconds=600,
+    stop_on_timeout=True,
+    tags=("cross-region", "slow"),
+))
+register(Scenario(
+    name="concurrent-write",
+    title="Concurrent PUTs to the Same Object from Two Regions",
+    op="concurrent",
+    key_prefix="simultaneous-write-test",
+    put_regions=("sjc", "fra"),
+    read_regions=("sjc", "fra"),
+    poll_interval=1.0,
+    max_poll_seconds=60,
+    tags=("cross-region", "concurrent"),
+))
+register(Scenario(
+    name="write-consistent",
+    title="Write and read object in same region using X-Tigris-Consistent:true header",
+    op="write",
+    key_prefix="strict-consistency-test",
+    put_regions=("fra",),
+    read_regions=("fra",),
+    consistent=True,
+    max_poll_seconds=0,
+    tags=("same-region", "consistent"),
+))
+register(Scenario(
+    name="overwrite-consistent",
+    title="Overwrite object with X-Tigris-Consistent:true in Region A, read with same header in Region A",
+    op="write",
+    key_prefix="overwrite-consistent-cross-region",
+    consistent=True,
+    poll_interval=1.0,
+    max_poll_seconds=60,
+    tags=("consistent",),
+))
+register(Scenario(
+    name="concurrent-write-consistent",
+    title="Simultaneous writes from two regions using consistency header X-Tigris-Consistent:true",
+    op="concurrent",
+    key_prefix="concurrent-consistent-write",
+    put_regions=("sjc", "fra"),
+    read_regions=("sjc", "fra"),
+    consistent=True,
+    probe="GET",
+    poll_interval=1.0,
+    max_poll_seconds=60,
+    tags=("cross-region", "concurrent", "consistent"),
+))
+register(Scenario(
+    name="multipart-same-region",
+    title="Multipart upload a large object and read it from the same region",
+    op="write",
+    key_prefix="multipart-test",
+    put_regions=("sjc",),
+    read_regions=("sjc",),
+    max_poll_seconds=60,
+    size=config.multipart_size_bytes,
+    part_size=config.part_size_bytes,
+    tags=("same-region", "large"),
+))
+register(Scenario(
+    name="multipart-cross-region",
+    title="Multipart upload a large object in Region A and read it from Region B",
+    op="write",
+    key_prefix="multipart-cross-region-test",
+    put_regions=("sjc",),
+    max_poll_seconds=600,
+    size=config.multipart_size_bytes,
+    part_size=config.part_size_bytes,
+    tags=("cross-region", "large"),
+))
+
+
+def select(selectors=()):
+    # Scenarios named by or tagged with any of `selectors`, in registration
+    # order. "large" ones only run when named, or with "large" or "all";
+    # no selectors means every other scenario.
+    unknown = [s for s in selectors if s != "all" and s not in SCENARIOS
+               and not any(s in scenario.tags for scenario in SCENARIOS.values())]
+    if unknown:
+        raise KeyError(f"no scenario named or tagged {', '.join(unknown)}")
+
+    def selected(s):
+        if "all" in selectors or s.name in selectors:
+            return True
+        if "large" in s.tags and "large" not in selectors:
+            return False
+        return not selectors or any(tag in selectors for tag in s.tags)
+
+    return [s for s in SCENARIOS.values() if selected(s)]
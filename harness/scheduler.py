@@ -0,0 +1,317 @@
+import argparse
+import asyncio
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+
+import aiohttp
+
+from harness import cleanup, config, metrics, payload, polling, results
+from harness.aio import open_client
+from harness.client import etag_of
+from harness.engine import conditions, converged, new_record
+from harness.histogram import Histogram
+from harness.scenarios import SCENARIOS
+from harness.sweep import parse_size
+
+# Ops whose convergence a single writer and the scheduler can follow
+SUPPORTED = ("write", "overwrite", "delete")
+
+
+@dataclass(slots=True)
+class Watch:
+    # Per-key state. A region is done at its first fresh probe; the key
+    # retires when every region is done or the deadline passes. As in
+    # engine.run_iteration the clock (start_ns) starts when the first probe
+    # returns; until then it holds the write's ack.
+    record: object
+    etag: str
+    headers: dict
+    pending: set
+    ack_ns: int
+    schedule: object
+    done: asyncio.Future
+    start_ns: int = None
+    deadline_ns: int = None
+    last_stale_ns: int = None
+    fresh_ns: dict = field(default_factory=dict)
+
+
+class Scheduler:
+    # One deadline-ordered heap of keys for the whole process instead of a
+    # sleeping loop per key: a single task pops every key whose probe is
+    # due, probes its pending regions over the client's pooled connections
+    # (at most `in_flight` keys at once) and pushes it back at its next
+    # due time, so tracking a key costs a heap entry, not a thread.
+    #
+    # Writers are admitted so that a key's first probe follows its write's
+    # ack within `max_lag` seconds: a key waits in the heap until a
+    # slot is free, and no write starts while the heap's head is more
+    # overdue than that. Writes between admission and their first probe are
+    # also capped, by a window that halves whenever a first probe comes
+    # late and grows by one per window of timely ones, since a saturated
+    # process delays the first probe before the key ever reaches the heap.
+    # A key whose first probe still came later is rejected as LATE: it may
+    # have converged unseen before the clock started.
+
+    def __init__(self, client, scenario, in_flight=256, max_lag=0.05, window=64):
+        self.client = client
+        self.scenario = scenario
+        self.heap = []
+        self.seq = itertools.count()
+        self.wakeup = asyncio.Event()
+        self.progress = asyncio.Event()
+        self.slots = asyncio.Semaphore(in_flight)
+        self.max_lag_ns = int(max_lag * 1e9)
+        self.window = window
+        self.unprobed = 0
+        self.probing = set()
+        self.probes = 0
+        self.active = 0
+        self.peak = 0
+        self.task = None
+
+    def __len__(self):
+        return self.active
+
+    def watch(self, record, etag, ack_ns=None):
+        # Follows `record.key` until it converges on `etag` (absent for
+        # deletes); the returned future resolves to the finished record.
+        scenario = self.scenario
+        ack_ns = ack_ns or time.perf_counter_ns()
+        watch = Watch(
+            record=record,
+            etag=etag,
+            headers=conditions(scenario, [etag] if etag else []),
+            pending=set(scenario.read_regions),
+            ack_ns=ack_ns,
+            schedule=polling.for_scenario(scenario),
+            done=asyncio.get_running_loop().create_future(),
+        )
+        # Kept apart from the engine's rows: the first probe waits its turn
+        # in the heap, which first_probe_ns reports on its own.
+        record.scenario = f"{scenario.name}-scheduled"
+        record.attempts = 0
+        self.push(ack_ns, watch)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+        return watch.done
+
+    def lag_ns(self):
+        # How overdue the most overdue probe is.
+        return max(time.perf_counter_ns() - self.heap[0][0], 0) if self.heap else 0
+
+    async def admit(self):
+        # Waits until a write may start; pair with watch() or abandon().
+        while self.unprobed >= self.window or self.lag_ns() > self.max_lag_ns:
+            self.progress.clear()
+            await self.progress.wait()
+        self.unprobed += 1
+
+    def abandon(self):
+        # An admitted write failed: nothing to probe.
+        self.unprobed -= 1
+        self.progress.set()
+
+    def probed(self, first_probe_ns):
+        self.unprobed -= 1
+        if first_probe_ns > self.max_lag_ns:
+            self.window = max(self.window / 2, 1)
+        else:
+            self.window += 1 / self.window
+        self.progress.set()
+
+    def push(self, due_ns, watch):
+        heapq.heappush(self.heap, (due_ns, next(self.seq), watch))
+        if self.heap[0][2] is watch:
+            self.wakeup.set()
+
+    async def run(self):
+        while True:
+            self.wakeup.clear()
+            if not self.heap:
+                await self.wakeup.wait()
+                continue
+            delay = self.heap[0][0] - time.perf_counter_ns()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), delay / 1e9)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.slots.acquire()
+            watch = heapq.heappop(self.heap)[2]
+            self.progress.set()
+            task = asyncio.create_task(self.probe(watch))
+            self.probing.add(task)
+            task.add_done_callback(self.probing.discard)
+
+    async def probe(self, watch):
+        scenario, record = self.scenario, watch.record
+        method = self.client.head if scenario.probe == "HEAD" else self.client.get
+        regions = sorted(watch.pending, key=str)
+        try:
+            responses = await asyncio.gather(
+                *(method(record.key, region, scenario.consistent, watch.headers) for region in regions),
+                return_exceptions=True,
+            )
+        finally:
+            self.slots.release()
+        self.probes += len(regions)
+        now = time.perf_counter_ns()
+        first = watch.start_ns is None
+        if first:
+            # The initial probe is not counted: a region it finds fresh
+            # converged in 0.
+            watch.start_ns = now
+            watch.deadline_ns = now + int(scenario.max_poll_seconds * 1e9)
+            record.first_probe_ns = now - watch.ack_ns
+            self.probed(record.first_probe_ns)
+        else:
+            record.attempts += 1
+        for region, resp in zip(regions, responses):
+            if isinstance(resp, BaseException):
+                continue
+            if converged(scenario, {region: resp}, watch.etag, record.size):
+                watch.fresh_ns[region] = watch.start_ns if first else resp.acked_ns
+                watch.pending.discard(region)
+            elif not first:
+                watch.last_stale_ns = resp.sent_ns
+        if not watch.pending:
+            self.retire(watch, "PASS")
+        elif now >= watch.deadline_ns:
+            self.retire(watch, "TIMEOUT")
+        else:
+            self.push(now + int(watch.schedule.delay((now - watch.start_ns) / 1e9) * 1e9), watch)
+
+    def retire(self, watch, status):
+        record = watch.record
+        if status == "PASS" and record.first_probe_ns > self.max_lag_ns:
+            record.fail("First probe late", "LATE")
+        elif status == "PASS":
+            record.status = "PASS"
+            record.convergence_ns = max(max(watch.fresh_ns.values()) - watch.start_ns, 0)
+            record.last_stale_ns = max((watch.last_stale_ns or watch.start_ns) - watch.start_ns, 0)
+        else:
+            record.fail(status)
+        self.active -= 1
+        watch.done.set_result(record)
+
+    async def close(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+
+async def write(client, scenario, record):
+    # The scenario's writes for one key; returns the ETag to wait for ("" for
+    # a delete) and the last write's ack, or (None, None) if a write failed.
+    region = scenario.put_regions[0]
+    for _ in range(2 if scenario.op == "overwrite" else 1):
+        resp = await client.put(record.key, payload.new(record.size), region, scenario.consistent)
+        if resp.status_code != 200 or not etag_of(resp):
+            return None, None
+    if scenario.op == "delete":
+        resp = await client.delete(record.key, region, scenario.consistent)
+        return ("", resp.acked_ns) if resp.status_code in (200, 204) else (None, None)
+    return etag_of(resp), resp.acked_ns
+
+
+async def track(scenario, sink, keys, writers, in_flight, size=None, max_lag=0.05):
+    # Writes `keys` objects, `writers` at a time, and hands each to the
+    # scheduler as soon as its write is acknowledged.
+    client = await open_client(scenario, max(writers, in_flight))
+    scheduler = Scheduler(client, scenario, in_flight, max_lag, writers)
+    queue = iter(range(keys))
+    watching = []
+    start = time.perf_counter_ns()
+
+    async def writer():
+        for i in queue:
+            await scheduler.admit()
+            record = new_record(scenario, i, size)
+            try:
+                etag, ack_ns = await write(client, scenario, record)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                scheduler.abandon()
+                sink.write(record.fail(str(e), "ERROR"))
+                continue
+            if etag is None:
+                scheduler.abandon()
+                sink.write(record.fail("PUT Failed"))
+                continue
+            watching.append(scheduler.watch(record, etag, ack_ns))
+
+    try:
+        await asyncio.gather(*(writer() for _ in range(writers)))
+        written = time.perf_counter_ns()
+        for done in asyncio.as_completed(watching):
+            sink.write(await done)
+    finally:
+        await scheduler.close()
+        await client.close()
+    return {
+        "max_lag": max_lag,
+        "write_s": (written - start) / 1e9,
+        "total_s": (time.perf_counter_ns() - start) / 1e9,
+        "probes": scheduler.probes,
+        "peak": scheduler.peak,
+    }
+
+
+def report(records, stats):
+    convergence, first_probe = Histogram(), Histogram()
+    for record in records:
+        if record.status == "PASS":
+            convergence.record(record.convergence_ns)
+        if record.first_probe_ns is not None:
+            first_probe.record(record.first_probe_ns)
+    print(results.summary_table(records))
+
+    def quantiles(histogram):
+        return ", ".join(f"{label} {histogram.quantile(q) / 1e6:.2f} ms"
+                         for label, q in (("p50", 0.5), ("p99", 0.99), ("p99.9", 0.999)))
+
+    print(f"{len(records)} keys written in {stats['write_s']:.1f} s, all settled after {stats['total_s']:.1f} s; "
+          f"{stats['peak']} tracked at once, {stats['probes']} probes ({stats['probes'] / stats['total_s']:.0f}/s)")
+    late = sum(record.status == "LATE" for record in records)
+    if convergence:
+        print(f"Convergence after the first probe: {quantiles(convergence)} "
+              f"({late} keys left out, first probe over {stats['max_lag'] * 1e3:.0f} ms after the ack)")
+    elif late:
+        print(f"No convergence measured: all {late} keys had their first probe over "
+              f"{stats['max_lag'] * 1e3:.0f} ms after the ack")
+    if first_probe:
+        print(f"Write ack to first probe: {quantiles(first_probe)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Track convergence of many objects at once from one process")
+    parser.add_argument("scenario", choices=sorted(n for n, s in SCENARIOS.items()
+                                                   if s.op in SUPPORTED and not s.part_size))
+    parser.add_argument("--keys", type=int, default=10000, help="objects to write and follow")
+    parser.add_argument("--size", type=parse_size, default=None, help="object size (default: FILE_SIZE_BYTES)")
+    parser.add_argument("--writers", type=int, default=64, help="PUTs in flight at once")
+    parser.add_argument("--in-flight", type=int, default=256, help="keys being probed at once")
+    parser.add_argument("--max-lag", type=float, default=0.05,
+                        help="seconds from a write's ack to its first probe; writes are held back to keep within it "
+                             "and keys past it are rejected as LATE")
+    args = parser.parse_args()
+    scenario = SCENARIOS[args.scenario]
+    metrics.serve()
+    print(scenario.title)
+    sink = results.open_sink(config.results)
+    try:
+        stats = asyncio.run(track(scenario, sink, args.keys, args.writers, args.in_flight, args.size,
+                                  args.max_lag))
+    finally:
+        sink.close()
+        cleanup.after_run([r.key for r in sink.records])
+    report(sink.records, stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import datetime
+import functools
+import hashlib
+import hmac
+from urllib.parse import parse_qsl, quote, urlsplit
+
+EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+# x-amz-content-sha256 values for bodies that are not hashed up front
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+STREAMING_PAYLOAD = "STREAMING-AWS4-HMAC-SHA256-PAYLOAD"
+
+
+def _hmac(key, msg):
+    return hmac.new(key, msg.encode(), hashlib.sha256).digest()
+
+
+@functools.lru_cache(maxsize=64)
+def signing_key(secret_key, date, region, service):
+    # Four chained HMACs that only change with the day, so derive them once.
+    key = _hmac(("AWS4" + secret_key).encode(), date)
+    key = _hmac(key, region)
+    key = _hmac(key, service)
+    return _hmac(key, "aws4_request")
+
+
+def _quote(s, safe="-_.~"):
+    return quote(s, safe=safe)
+
+
+def sign(method, url, headers, payload_hash, credentials, region="auto", service="s3", now=None):
+    # Returns the headers to add to the request for AWS Signature Version 4.
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    date = amz_date[:8]
+    parts = urlsplit(url)
+    added = {
+        "x-amz-date": amz_date,
+        "x-amz-content-sha256": payload_hash,
+    }
+    if credentials.token:
+        added["x-amz-security-token"] = credentials.token
+    signed = {k.lower(): " ".join(str(v).split()) for k, v in headers.items()}
+    signed.update(added)
+    signed["host"] = parts.netloc
+    names = sorted(signed)
+    canonical_headers = "".join(f"{name}:{signed[name]}\n" for name in names)
+    signed_headers = ";".join(names)
+    query = "&".join(
+        f"{k}={v}" for k, v in sorted(
+            (_quote(k), _quote(v)) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        )
+    )
+    canonical_request = "\n".join([
+        method,
+        _quote(parts.path or "/", safe="/-_.~%"),
+        query,
+        canonical_headers,
+        signed_headers,
+        payload_hash,
+    ])
+    scope = f"{date}/{region}/{service}/aws4_request"
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256",
+        amz_date,
+        scope,
+        hashlib.sha256(canonical_request.encode()).hexdigest(),
+    ])
+    key = signing_key(credentials.secret_key, date, region, service)
+    signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+    added["Authorization"] = (
+        f"AWS4-HMAC-SHA256 Credential={credentials.access_key}/{scope}, "
+        f"SignedHeaders={signed_headers}, Signature={signature}"
+    )
+    return added
+
+
+class ChunkSigner:
+    # Signs an aws-chunked body (STREAMING-AWS4-HMAC-SHA256-PAYLOAD): every
+    # chunk's signature chains from the previous one, starting from the
+    # request's own. seed() takes the signed request headers.
+
+    def __init__(self, credentials, region="auto", service="s3"):
+        self.credentials = credentials
+        self.region = region
+        self.service = service
+        self.previous = None
+
+    def seed(self, headers):
+        self.previous = headers["Authorization"].rpartition("Signature=")[2]
+        self.amz_date = headers["x-amz-date"]
+        date = self.amz_date[:8]
+        self.scope = f"{date}/{self.region}/{self.service}/aws4_request"
+        self.key = signing_key(self.credentials.secret_key, date, self.region, self.service)
+
+    def frame(self, chunk):
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256-PAYLOAD",
+            self.amz_date,
+            self.scope,
+            self.previous,
+            EMPTY_SHA256,
+            hashlib.sha256(chunk).hexdigest(),
+        ])
+        self.previous = hmac.new(self.key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+        return f"{len(chunk):x};chunk-signature={self.previous}\r\n".encode() + chunk + b"\r\n"
+
+
+def framed_length(sizes):
+    # Encoded length of an aws-chunked body with chunks of `sizes` plus the final empty one.
+    return sum(len(f"{size:x};chunk-signature=\r\n\r\n") + 64 + size for size in [*sizes, 0])
@@ -0,0 +1,202 @@
+import argparse
+import collections
+import itertools
+import json
+import math
+import os
+import time
+
+import requests
+from tabulate import tabulate
+
+from harness import cleanup, config, engine, metrics, timing
+from harness.client import connect
+from harness.histogram import Histogram
+from harness.results import RotatingSink
+from harness.scenarios import SCENARIOS
+
+# The cross-region convergence checks (main4.py, main5.py, main6.py)
+CANARY = ("write-cross-region", "overwrite-cross-region", "delete-cross-region")
+
+
+class Rolling:
+    # Convergence over the last `window` seconds, kept as one histogram per
+    # `slot` seconds; slots older than the window are dropped, so memory is
+    # bounded by window / slot histograms.
+
+    def __init__(self, window, slot):
+        self.window = window
+        self.slot = slot
+        self.slots = collections.deque()
+
+    def record(self, now, value):
+        start = now - now % self.slot
+        if not self.slots or self.slots[-1][0] != start:
+            self.slots.append((start, Histogram()))
+        self.slots[-1][1].record(value)
+
+    def merged(self, now):
+        while self.slots and self.slots[0][0] <= now - self.window:
+            self.slots.popleft()
+        total = Histogram()
+        for _, histogram in self.slots:
+            total.merge(histogram)
+        return total
+
+
+class Stats:
+    # Per-scenario distributions: lifetime, rolling window and the interval
+    # since the last snapshot, plus status counts and the start slots its
+    # overrunning iterations made the soak skip, for the lifetime and interval.
+
+    def __init__(self, window, slot):
+        self.lifetime = Histogram()
+        self.rolling = Rolling(window, slot)
+        self.interval = Histogram()
+        self.statuses = collections.Counter()
+        self.interval_statuses = collections.Counter()
+        self.skipped = self.interval_skipped = 0
+
+    def skip(self, slots):
+        self.skipped += slots
+        self.interval_skipped += slots
+
+    def observe(self, record, now):
+        self.statuses[record.status] += 1
+        self.interval_statuses[record.status] += 1
+        if record.status == "PASS":
+            for histogram in (self.lifetime, self.interval):
+                histogram.record(record.convergence_ns)
+            self.rolling.record(now, record.convergence_ns)
+
+    def snapshot(self, name, now):
+        # One JSON line: quantiles for humans plus the interval histogram, so
+        # intervals merge into any longer range offline.
+        snapshot = {
+            "time": now,
+            "scenario": name,
+            "statuses": dict(self.interval_statuses),
+            "lifetime_statuses": dict(self.statuses),
+            "skipped": self.interval_skipped,
+            "lifetime_skipped": self.skipped,
+            "interval": self.interval.to_dict(),
+        }
+        for label, histogram in (("interval", self.interval), ("rolling", self.rolling.merged(now)),
+                                 ("lifetime", self.lifetime)):
+            snapshot[f"{label}_ms"] = quantiles(histogram)
+        self.interval = Histogram()
+        self.interval_statuses = collections.Counter()
+        self.interval_skipped = 0
+        return snapshot
+
+
+def quantiles(histogram):
+    return {label: None if histogram.quantile(q) is None else histogram.quantile(q) / 1e6
+            for label, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))}
+
+
+def report(snapshots):
+    def cell(value):
+        return "-" if value is None else f"{value:.2f}"
+
+    rows = []
+    for s in snapshots:
+        rows.append([s["scenario"], sum(s["lifetime_statuses"].values()),
+                     sum(n for status, n in s["lifetime_statuses"].items() if status != "PASS"),
+                     s["lifetime_skipped"]]
+                    + [cell(s["rolling_ms"][label]) for label in ("p50", "p99", "max")]
+                    + [cell(s["lifetime_ms"][label]) for label in ("p50", "p99", "max")])
+    headers = ["Scenario", "Runs", "Fail", "Skipped", "Window p50 (ms)", "Window p99 (ms)", "Window max (ms)",
+               "Lifetime p50 (ms)", "Lifetime p99 (ms)", "Lifetime max (ms)"]
+    print(time.strftime("%Y-%m-%d %H:%M:%S"), tabulate(rows, headers=headers, tablefmt="grid"), sep="\n")
+
+
+def soak(client, scenarios, directory, interval, duration, window, slot, report_every, rotate, keep):
+    # Runs the scenarios round robin, starting one iteration every `interval`
+    # seconds, until `duration` (forever if None) or Ctrl-C. Start slots an
+    # iteration overran are skipped, not made up back to back, and counted
+    # against its scenario. Nothing grows with the run: records go to
+    # rotating files, keys are deleted at every snapshot, and the
+    # distributions live in fixed-size histograms.
+    stats = {s.name: Stats(window, slot) for s in scenarios}
+    sink = RotatingSink(directory, rotate, keep)
+    pending = []
+    start = due = time.time()
+    next_report = start + report_every
+    snapshots = open(os.path.join(directory, "snapshots.jsonl"), "a")
+    try:
+        for i in itertools.count():
+            now = time.time()
+            if duration is not None and now - start >= duration:
+                break
+            if now >= next_report:
+                flush(client, stats, snapshots, pending, now)
+                next_report = now + report_every
+            if due > now:
+                time.sleep(due - now)
+            scenario = scenarios[i % len(scenarios)]
+            record = engine.new_record(scenario, i)
+            try:
+                with timing.recording(record.trace):
+                    engine.run_iteration(client, scenario, record)
+            except requests.RequestException as e:
+                record.fail(str(e), "ERROR")
+            sink.write(record)
+            now = time.time()
+            stats[scenario.name].observe(record, now)
+            pending.append(record.key)
+            due += interval
+            if due < now and interval:
+                missed = math.ceil((now - due) / interval)
+                stats[scenario.name].skip(missed)
+                due += missed * interval
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sink.close()
+        try:
+            flush(client, stats, snapshots, pending, time.time())
+        finally:
+            snapshots.close()
+
+
+def flush(client, stats, snapshots, pending, now):
+    taken = [s.snapshot(name, now) for name, s in stats.items()]
+    for snapshot in taken:
+        snapshots.write(json.dumps(snapshot, separators=(",", ":")) + "\n")
+    snapshots.flush()
+    report(taken)
+    if config.cleanup and pending:
+        cleanup.report(*cleanup.purge(client, pending))
+    pending.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run convergence scenarios continuously with bounded memory")
+    parser.add_argument("scenarios", nargs="*", metavar="scenario",
+                        help="scenarios to cycle through (default: the cross-region checks)")
+    parser.add_argument("--dir", default="soak", help="directory for rotated results and snapshots.jsonl")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between iteration starts")
+    parser.add_argument("--duration", type=float, default=None, help="seconds to run (default: forever)")
+    parser.add_argument("--window", type=float, default=3600.0, help="rolling window in seconds")
+    parser.add_argument("--slot", type=float, default=60.0, help="rolling window granularity in seconds")
+    parser.add_argument("--report", type=float, default=300.0, help="seconds between snapshots")
+    parser.add_argument("--rotate", type=float, default=3600.0, help="seconds per result file")
+    parser.add_argument("--keep", type=int, default=168, help="result files kept")
+    args = parser.parse_args()
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(unknown)} (choose from {', '.join(sorted(SCENARIOS))})")
+    scenarios = [SCENARIOS[name] for name in args.scenarios or CANARY]
+    metrics.serve()
+    client = connect()
+    try:
+        client.warm({r for s in scenarios for r in s.regions()})
+        soak(client, scenarios, args.dir, args.interval, args.duration, args.window, args.slot, args.report,
+             args.rotate, args.keep)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,495 @@
+import argparse
+import base64
+import bisect
+import hashlib
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+import uuid
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape, unescape
+
+from harness import config
+
+XMLNS = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+
+def parse_delay(spec):
+    # Replication delay in seconds: "fixed:0.2", "uniform:0.05,0.5",
+    # "exp:0.1" (mean) or "lognormal:mu,sigma".
+    kind, _, args = spec.partition(":")
+    params = [float(a) for a in args.split(",") if a]
+    if kind == "fixed":
+        return lambda rng: params[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(params[0], params[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1 / params[0]) if params[0] > 0 else 0.0
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(params[0], params[1])
+    raise ValueError(f"unknown delay distribution: {spec}")
+
+
+def etag_matches(header, etag):
+    tags = [tag.strip().removeprefix("W/").strip('"') for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+class Version:
+    __slots__ = ("body", "etag", "stamp", "deleted", "modified")
+
+    def __init__(self, body, stamp, deleted=False, etag=None):
+        self.body = body
+        self.etag = etag or hashlib.md5(body).hexdigest()
+        self.stamp = stamp
+        self.deleted = deleted
+        self.modified = formatdate(stamp[0] / 1e9, usegmt=True)
+
+
+class Replica(dict):
+    # One region's objects, plus their paths kept sorted for listing.
+
+    def __init__(self):
+        super().__init__()
+        self.paths = []
+
+
+class Store:
+    # Per-region replicas of every object. A write lands in its region at once
+    # and reaches the others after a sampled delay; replicas keep the version
+    # with the highest (timestamp, sequence) stamp, so the last writer wins.
+    # X-Tigris-Consistent writes reach every replica before they are acked, and
+    # consistent reads are served from the newest version seen anywhere.
+
+    def __init__(self, regions=("sjc", "fra"), default_region=None, delay="fixed:0", seed=None):
+        self.regions = tuple(regions)
+        self.default_region = default_region or self.regions[-1]
+        self.delay = parse_delay(delay) if isinstance(delay, str) else delay
+        self.rng = random.Random(seed)
+        self.replicas = {region: Replica() for region in self.regions}
+        self.latest = Replica()
+        self.buckets = {}
+        # upload id -> (path, {part number: body})
+        self.uploads = {}
+        self.pending = []
+        self.seq = itertools.count()
+        self.lock = threading.Lock()
+
+    def region(self, header):
+        if not header:
+            return self.default_region
+        region = header.split(",")[0].strip()
+        if region not in self.replicas:
+            raise KeyError(region)
+        return region
+
+    def _apply(self, replica, path, version):
+        current = replica.get(path)
+        if current is None:
+            bisect.insort(replica.paths, path)
+        if current is None or version.stamp > current.stamp:
+            replica[path] = version
+
+    def _advance(self):
+        # Replication is applied lazily: due entries are drained on every access.
+        now = time.monotonic()
+        while self.pending and self.pending[0][0] <= now:
+            _, _, region, path, version = heapq.heappop(self.pending)
+            self._apply(self.replicas[region], path, version)
+
+    def write(self, path, body, region, consistent=False, deleted=False, etag=None):
+        with self.lock:
+            self._advance()
+            version = Version(body, (time.time_ns(), next(self.seq)), deleted, etag)
+            self._apply(self.latest, path, version)
+            now = time.monotonic()
+            for other in self.regions:
+                if other == region or consistent:
+                    self._apply(self.replicas[other], path, version)
+                else:
+                    delay = self.delay(self.rng)
+                    heapq.heappush(self.pending, (now + delay, next(self.seq), other, path, version))
+            return version
+
+    def read(self, path, region, consistent=False):
+        with self.lock:
+            self._advance()
+            version = (self.latest if consistent else self.replicas[region]).get(path)
+            if version is None or version.deleted:
+                return None
+            return version
+
+    def list(self, bucket, prefix, region, consistent=False, start_after="", limit=1000):
+        # Live objects under `prefix` after `start_after` in key order, as seen
+        # by one region; returns ([(key, version)], truncated).
+        with self.lock:
+            self._advance()
+            replica = self.latest if consistent else self.replicas[region]
+            if start_after >= prefix:
+                i = bisect.bisect_right(replica.paths, (bucket, start_after))
+            else:
+                i = bisect.bisect_left(replica.paths, (bucket, prefix))
+            found = []
+            for path in itertools.islice(replica.paths, i, None):
+                if path[0] != bucket or not path[1].startswith(prefix):
+                    break
+                version = replica[path]
+                if version.deleted:
+                    continue
+                if len(found) == limit:
+                    return found, True
+                found.append((path[1], version))
+            return found, False
+
+    def create_upload(self, path):
+        with self.lock:
+            upload_id = uuid.uuid4().hex
+            self.uploads[upload_id] = (path, {})
+            return upload_id
+
+    def put_part(self, upload_id, path, number, body):
+        with self.lock:
+            upload = self.uploads.get(upload_id)
+            if upload is None or upload[0] != path:
+                return None
+            upload[1][number] = body
+            return hashlib.md5(body).hexdigest()
+
+    def complete_upload(self, upload_id, path, etags, region, consistent=False):
+        # Assembles the listed parts; the ETag is the MD5 of the parts' MD5s
+        # followed by the part count, as S3 computes it. Returns None for an
+        # unknown upload and False when a part is missing or its ETag differs.
+        with self.lock:
+            upload = self.uploads.get(upload_id)
+            if upload is None or upload[0] != path:
+                return None
+            parts = upload[1]
+            digests = []
+            for number, etag in etags:
+                if number not in parts or hashlib.md5(parts[number]).hexdigest() != etag:
+                    return False
+                digests.append(hashlib.md5(parts[number]).digest())
+            del self.uploads[upload_id]
+        body = b"".join(parts[number] for number, _ in etags)
+        etag = f"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(etags)}"
+        return self.write(path, body, region, consistent, etag=etag)
+
+    def abort_upload(self, upload_id):
+        with self.lock:
+            return self.uploads.pop(upload_id, None) is not None
+
+    def create_bucket(self, bucket):
+        with self.lock:
+            self.buckets.setdefault(bucket, time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()))
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "TigrisStandIn"
+    # Headers and body go out in separate writes; without this a GET stalls
+    # on Nagle plus the client's delayed ACK for ~40ms.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    @property
+    def store(self):
+        return self.server.store
+
+    def route(self):
+        parts = urlsplit(self.path)
+        bucket, _, key = unquote(parts.path).lstrip("/").partition("/")
+        self.query = parse_qs(parts.query, keep_blank_values=True)
+        self.consistent = self.headers.get("X-Tigris-Consistent", "").lower() == "true"
+        return bucket, key
+
+    def read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                if size == 0:
+                    while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    return b"".join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if "aws-chunked" in self.headers.get("Content-Encoding", ""):
+            # Signed chunks: "<hex size>;chunk-signature=<sig>\r\n<data>\r\n" up
+            # to an empty one. Signatures aren't checked, like the request's.
+            chunks, offset = [], 0
+            while True:
+                end = body.index(b"\r\n", offset)
+                size = int(body[offset:end].split(b";")[0], 16)
+                if size == 0:
+                    return b"".join(chunks)
+                chunks.append(body[end + 2:end + 2 + size])
+                offset = end + 2 + size + 2
+        return body
+
+    def send(self, status, body=b"", headers=None, content_length=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body) if content_length is None else content_length))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def error(self, status, code, message=""):
+        body = (
+            f'<?xml version="1.0" encoding="UTF-8"?>'
+            f"<Error><Code>{code}</Code><Message>{escape(message)}</Message></Error>"
+        ).encode()
+        self.send(status, body, {"Content-Type": "application/xml"})
+
+    def xml(self, body):
+        self.send(200, ('<?xml version="1.0" encoding="UTF-8"?>' + body).encode(), {"Content-Type": "application/xml"})
+
+    def object_headers(self, version, region):
+        return {
+            "ETag": f'"{version.etag}"',
+            "Last-Modified": version.modified,
+            "Content-Type": "application/octet-stream",
+            "X-Tigris-Served-Region": region,
+        }
+
+    def precondition(self, version):
+        if_match = self.headers.get("If-Match")
+        if if_match and not etag_matches(if_match, version.etag):
+            return 412
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match and etag_matches(if_none_match, version.etag):
+            return 304
+        return None
+
+    def dispatch(self, handler):
+        try:
+            bucket, key = self.route()
+            if self.command in ("PUT", "POST"):
+                self.body = self.read_body()
+            region = self.store.region(self.headers.get("X-Tigris-Regions"))
+            handler(bucket, key, region)
+        except KeyError as e:
+            self.error(400, "InvalidRegion", f"unknown region {e}")
+
+    def do_GET(self):
+        self.dispatch(self.get)
+
+    def do_HEAD(self):
+        self.dispatch(self.get)
+
+    def do_PUT(self):
+        self.dispatch(self.put)
+
+    def do_POST(self):
+        self.dispatch(self.post)
+
+    def do_DELETE(self):
+        self.dispatch(self.delete)
+
+    def get(self, bucket, key, region):
+        if not bucket:
+            return self.list_buckets()
+        if bucket not in self.store.buckets:
+            return self.error(404, "NoSuchBucket")
+        if not key and "list-type" in self.query:
+            return self.list_objects(bucket, region)
+        if not key:
+            return self.send(200)
+        version = self.store.read((bucket, key), region, self.consistent)
+        if version is None:
+            return self.error(404, "NoSuchKey")
+        status = self.precondition(version)
+        if status == 412:
+            return self.error(412, "PreconditionFailed")
+        if status == 304:
+            return self.send(304, headers={"ETag": f'"{version.etag}"', "Last-Modified": version.modified})
+        self.send(200, version.body, self.object_headers(version, region))
+
+    def put(self, bucket, key, region):
+        if not key:
+            self.store.create_bucket(bucket)
+            return self.send(200)
+        if bucket not in self.store.buckets:
+            return self.error(404, "NoSuchBucket")
+        if "uploadId" in self.query:
+            return self.put_part(bucket, key)
+        version = self.store.write((bucket, key), self.body, region, self.consistent)
+        self.send(200, headers={"ETag": f'"{version.etag}"', "X-Tigris-Served-Region": region})
+
+    def put_part(self, bucket, key):
+        number = int(self.query.get("partNumber", ["0"])[0])
+        if not 1 <= number <= 10000:
+            return self.error(400, "InvalidArgument", "partNumber must be between 1 and 10000")
+        etag = self.store.put_part(self.query["uploadId"][0], (bucket, key), number, self.body)
+        if etag is None:
+            return self.error(404, "NoSuchUpload")
+        self.send(200, headers={"ETag": f'"{etag}"'})
+
+    def post(self, bucket, key, region):
+        if bucket not in self.store.buckets:
+            return self.error(404, "NoSuchBucket")
+        if not key and "delete" in self.query:
+            return self.delete_objects(bucket, region)
+        if not key:
+            return self.error(400, "InvalidRequest")
+        if "uploads" in self.query:
+            upload_id = self.store.create_upload((bucket, key))
+            return self.xml(
+                f'<InitiateMultipartUploadResult xmlns="{XMLNS}"><Bucket>{escape(bucket)}</Bucket>'
+                f"<Key>{escape(key)}</Key><UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>"
+            )
+        if "uploadId" in self.query:
+            etags = [
+                (int(number), unescape(etag).strip('"'))
+                for number, etag in re.findall(
+                    r"<PartNumber>\s*(\d+)\s*</PartNumber>\s*<ETag>(.*?)</ETag>", self.body.decode(), re.S
+                )
+            ]
+            if not etags or [n for n, _ in etags] != sorted({n for n, _ in etags}):
+                return self.error(400, "InvalidPartOrder")
+            version = self.store.complete_upload(self.query["uploadId"][0], (bucket, key), etags, region,
+                                                 self.consistent)
+            if version is None:
+                return self.error(404, "NoSuchUpload")
+            if version is False:
+                return self.error(400, "InvalidPart")
+            return self.xml(
+                f'<CompleteMultipartUploadResult xmlns="{XMLNS}"><Bucket>{escape(bucket)}</Bucket>'
+                f'<Key>{escape(key)}</Key><ETag>"{version.etag}"</ETag></CompleteMultipartUploadResult>'
+            )
+        self.error(400, "InvalidRequest")
+
+    def delete(self, bucket, key, region):
+        if bucket not in self.store.buckets:
+            return self.error(404, "NoSuchBucket")
+        if "uploadId" in self.query:
+            if not self.store.abort_upload(self.query["uploadId"][0]):
+                return self.error(404, "NoSuchUpload")
+            return self.send(204)
+        self.store.write((bucket, key), b"", region, self.consistent, deleted=True)
+        self.send(204, headers={"X-Tigris-Served-Region": region})
+
+    def list_objects(self, bucket, region):
+        # ListObjectsV2; the continuation token is the last key returned.
+        def arg(name, default=""):
+            return self.query.get(name, [default])[0]
+
+        prefix = arg("prefix")
+        limit = min(int(arg("max-keys", "1000")), 1000)
+        token = arg("continuation-token")
+        start_after = base64.urlsafe_b64decode(token).decode() if token else arg("start-after")
+        found, truncated = self.store.list(bucket, prefix, region, self.consistent, start_after, limit)
+        contents = "".join(
+            f"<Contents><Key>{escape(key)}</Key>"
+            f"<LastModified>{time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(v.stamp[0] / 1e9))}</LastModified>"
+            f'<ETag>"{v.etag}"</ETag><Size>{len(v.body)}</Size><StorageClass>STANDARD</StorageClass></Contents>'
+            for key, v in found
+        )
+        next_token = ""
+        if truncated:
+            next_token = base64.urlsafe_b64encode(found[-1][0].encode()).decode()
+            next_token = f"<NextContinuationToken>{next_token}</NextContinuationToken>"
+        self.xml(
+            f'<ListBucketResult xmlns="{XMLNS}"><Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix>'
+            f"<KeyCount>{len(found)}</KeyCount><MaxKeys>{limit}</MaxKeys>"
+            f"<IsTruncated>{'true' if truncated else 'false'}</IsTruncated>{next_token}{contents}</ListBucketResult>"
+        )
+
+    def delete_objects(self, bucket, region):
+        md5 = self.headers.get("Content-MD5")
+        if md5 and base64.b64decode(md5) != hashlib.md5(self.body).digest():
+            return self.error(400, "BadDigest")
+        text = self.body.decode()
+        keys = [unescape(key) for key in re.findall(r"<Key>(.*?)</Key>", text, re.S)]
+        if not keys or len(keys) > 1000:
+            return self.error(400, "MalformedXML")
+        for key in keys:
+            self.store.write((bucket, key), b"", region, self.consistent, deleted=True)
+        quiet = re.search(r"<Quiet>\s*true\s*</Quiet>", text, re.I)
+        deleted = "" if quiet else "".join(f"<Deleted><Key>{escape(key)}</Key></Deleted>" for key in keys)
+        self.xml(f'<DeleteResult xmlns="{XMLNS}">{deleted}</DeleteResult>')
+
+    def list_buckets(self):
+        buckets = "".join(
+            f"<Bucket><Name>{escape(name)}</Name><CreationDate>{created}</CreationDate></Bucket>"
+            for name, created in sorted(self.store.buckets.items())
+        )
+        self.xml(
+            f'<ListAllMyBucketsResult xmlns="{XMLNS}">'
+            f"<Owner><ID>standin</ID><DisplayName>standin</DisplayName></Owner>"
+            f"<Buckets>{buckets}</Buckets></ListAllMyBucketsResult>"
+        )
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, store, verbose=False):
+        super().__init__(address, Handler)
+        self.store = store
+        self.verbose = verbose
+
+    @property
+    def endpoint(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def serve(host="127.0.0.1", port=0, verbose=False, **kwargs):
+    # Starts a stand-in on a background thread; port 0 picks a free port.
+    server = Server((host, port), Store(**kwargs), verbose)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+_in_process = None
+
+
+def resolve_endpoint(endpoint):
+    # ENDPOINT=standin runs the scenarios against an in-process stand-in.
+    global _in_process
+    if endpoint != "standin":
+        return endpoint
+    if _in_process is None:
+        _in_process = serve(
+            regions=config.standin_regions,
+            default_region=config.standin_default_region,
+            delay=config.standin_delay,
+        )
+    return _in_process.endpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local multi-region Tigris stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--regions", default=",".join(config.standin_regions))
+    parser.add_argument("--default-region", default=config.standin_default_region)
+    parser.add_argument("--delay", default=config.standin_delay)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    server = Server(
+        (args.host, args.port),
+        Store(args.regions.split(","), args.default_region, args.delay, args.seed),
+        args.verbose,
+    )
+    print("Tigris stand-in listening on", server.endpoint)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
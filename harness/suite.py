@@ -0,0 +1,116 @@
+import argparse
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tabulate import tabulate
+
+from harness import cleanup, config, engine, history, metrics, results
+from harness.client import connect
+from harness.scenarios import SCENARIOS, select
+
+
+def regions_of(scenarios):
+    return tuple(dict.fromkeys(r for s in scenarios for r in s.regions()))
+
+
+def run_threads(client, scenarios, sink, parallel):
+    # Every scenario shares the one warm client; with parallel > 1 up to that
+    # many run at once, each on its own thread.
+    def one(scenario):
+        print(scenario.title)
+        engine.run(client, scenario, sink)
+
+    if parallel <= 1:
+        for scenario in scenarios:
+            one(scenario)
+        return
+    with ThreadPoolExecutor(parallel) as pool:
+        for future in [pool.submit(contextvars.copy_context().run, one, s) for s in scenarios]:
+            future.result()
+
+
+async def run_async(scenarios, sink, parallel):
+    # CONCURRENCY > 1: the asyncio runner, one client for every scenario.
+    from harness import aio
+
+    client = await aio.open_client(None, config.concurrency * parallel, regions=regions_of(scenarios))
+    semaphore = asyncio.Semaphore(parallel)
+
+    async def one(scenario):
+        async with semaphore:
+            print(scenario.title)
+            await aio.run(client, scenario, sink)
+
+    try:
+        await asyncio.gather(*(one(s) for s in scenarios))
+    finally:
+        await client.close()
+
+
+def report(scenarios, records, log, elapsed, grids=False):
+    order = {s.name: i for i, s in enumerate(scenarios)}
+    records = sorted(records, key=lambda r: (order[r.scenario], r.run))
+    if grids:
+        for scenario in scenarios:
+            own = [r for r in records if r.scenario == scenario.name]
+            print(scenario.title)
+            print(results.grid(own, winners=scenario.op == "concurrent"))
+    print(results.summary_table(records))
+    concurrent = [r for r in records if SCENARIOS[r.scenario].op == "concurrent"]
+    if concurrent:
+        print(results.winners_table(concurrent))
+    multipart = [r for r in records if SCENARIOS[r.scenario].part_size]
+    if multipart:
+        print(results.upload_table(multipart))
+    if any(s.consistent for s in scenarios):
+        print(history.report(history.check(log.ops)))
+    requests = sum(len(r.trace) for r in records)
+    print(f"{len(scenarios)} scenarios, {len(records)} iterations, {requests} requests in {elapsed:.1f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python3 -m harness",
+                                     description="Run scenarios, selected by name or tag, in one warm process")
+    parser.add_argument("selectors", nargs="*", metavar="scenario-or-tag",
+                        help='scenario names or tags; "all" for every scenario (default: all but "large")')
+    parser.add_argument("--parallel", type=int, default=1, help="scenarios run at the same time")
+    parser.add_argument("--grids", action="store_true", help="print each scenario's iteration grid too")
+    parser.add_argument("--list", action="store_true", help="list scenarios and their tags")
+    args = parser.parse_args()
+    if args.list:
+        print(tabulate([[s.name, ", ".join(s.tags), s.title] for s in SCENARIOS.values()],
+                       headers=["Scenario", "Tags", "Title"]))
+        return
+    try:
+        scenarios = select(args.selectors)
+    except KeyError as e:
+        parser.error(e.args[0])
+    metrics.serve()
+    print(f"Running {len(scenarios)} scenarios: {', '.join(s.name for s in scenarios)}")
+    start = time.perf_counter()
+    sink = results.open_sink(config.results)
+    log = history.History(config.history)
+    client = None
+    try:
+        with history.recording(log):
+            if config.concurrency > 1:
+                asyncio.run(run_async(scenarios, sink, args.parallel))
+            else:
+                client = connect()
+                client.warm(regions_of(scenarios))
+                run_threads(client, scenarios, sink, args.parallel)
+    finally:
+        sink.close()
+        log.close()
+        try:
+            cleanup.after_run([r.key for r in sink.records], client)
+        finally:
+            if client:
+                client.close()
+    report(scenarios, sink.records, log, time.perf_counter() - start, args.grids)
+
+
+if __name__ == "__main__":
+    main()
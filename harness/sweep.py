@@ -0,0 +1,120 @@
+import argparse
+import itertools
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from harness import cleanup, config, engine, results, standin
+from harness.client import connect
+from harness.scenarios import Scenario
+
+UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+# One client per worker process, so each keeps its own warm connection pools.
+_client = None
+
+
+def parse_size(text):
+    # "1024", "64KiB", "1m" -> bytes
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([kmg]?)(?:i?b)?", text.strip().lower())
+    if not match:
+        raise ValueError(f"bad size: {text}")
+    return int(float(match[1]) * UNITS[match[2]])
+
+
+def parse_regions(text):
+    # "sjc:fra" writes from sjc and reads from fra; "default" is the default replica.
+    put, _, read = text.partition(":")
+    return tuple(None if r in ("", "default") else r for r in (put, read or put))
+
+
+def concurrent_pair(regions):
+    # Concurrent writers are told apart by region, so a concurrent cell needs
+    # two different ones.
+    return regions[0] != regions[1]
+
+
+def cell_scenario(op, regions, consistent, size, polling, max_poll_seconds):
+    put, read = regions
+    if op == "concurrent" and not concurrent_pair(regions):
+        raise ValueError(f"concurrent cell needs two regions, got {put or 'default'}:{read or 'default'}")
+    name = f"{op}-{put or 'default'}-{read or 'default'}-{size}{'-consistent' if consistent else ''}-{polling}"
+    return Scenario(
+        name=name,
+        title=name,
+        op=op,
+        key_prefix=f"sweep-{op}",
+        put_regions=(put, read) if op == "concurrent" else (put,),
+        read_regions=tuple(dict.fromkeys((put, read))) if op == "concurrent" else (read,),
+        consistent=consistent,
+        max_poll_seconds=max_poll_seconds,
+    )
+
+
+def _init_worker(endpoint, bucket):
+    global _client
+    _client = connect(endpoint, bucket)
+
+
+def run_cell(scenario, size, polling, iterations):
+    # Runs in a worker process; cells run one at a time per process, so the
+    # polling strategy can be set process-wide.
+    config.polling = polling
+    _client.warm(scenario.regions())
+    return engine.run(_client, scenario, results.Sink(), iterations, size)
+
+
+def sweep(cells, iterations, workers, sink, endpoint=None, bucket=None):
+    # Spreads the cells over a process pool and writes every record to the
+    # sink as its cell finishes.
+    endpoint = standin.resolve_endpoint(endpoint or config.endpoint)
+    bucket = bucket or config.bucket
+    records = []
+    # spawn: the parent may be serving the in-process stand-in on a thread
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, context, _init_worker, (endpoint, bucket)) as pool:
+        futures = [pool.submit(run_cell, scenario, size, polling, iterations) for scenario, size, polling in cells]
+        for i, future in enumerate(as_completed(futures), 1):
+            cell_records = future.result()
+            for record in cell_records:
+                sink.write(record)
+            records.extend(cell_records)
+            print(f"Cell {i}/{len(futures)} done: {cell_records[0].scenario if cell_records else '-'}")
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a matrix of scenario variants across a process pool")
+    parser.add_argument("--ops", default="write,overwrite,delete,concurrent")
+    parser.add_argument("--sizes", default="1KiB,1MiB", help="object sizes, e.g. 1024,64KiB,16MiB")
+    parser.add_argument("--regions", default="sjc:sjc,sjc:fra", help="put:read region pairs")
+    parser.add_argument("--consistent", choices=["off", "on", "both"], default="both")
+    parser.add_argument("--polling", default=config.polling, help="polling strategies, e.g. adaptive,fixed")
+    parser.add_argument("--iterations", type=int, default=config.iterations, help="iterations per cell")
+    parser.add_argument("--max-poll", type=float, default=60.0, help="seconds before a cell iteration times out")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    args = parser.parse_args()
+    consistency = {"off": [False], "on": [True], "both": [False, True]}[args.consistent]
+    cells, skipped = [], set()
+    for op, size, regions, consistent, polling in itertools.product(
+        args.ops.split(","), args.sizes.split(","), args.regions.split(","), consistency, args.polling.split(",")
+    ):
+        if op == "concurrent" and not concurrent_pair(parse_regions(regions)):
+            skipped.add(regions)
+            continue
+        cells.append((cell_scenario(op, parse_regions(regions), consistent, parse_size(size), polling, args.max_poll),
+                      parse_size(size), polling))
+    if skipped:
+        print(f"Skipping concurrent cells for single-region pairs: {', '.join(sorted(skipped))}")
+    print(f"{len(cells)} cells x {args.iterations} iterations on {args.workers} workers")
+    sink = results.open_sink(config.results)
+    try:
+        records = sweep(cells, args.iterations, args.workers, sink)
+    finally:
+        sink.close()
+        cleanup.after_run([r.key for r in sink.records])
+    print(results.summary_table(sorted(records, key=lambda r: (r.scenario, r.run))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import contextvars
+import socket
+import time
+from contextlib import contextmanager
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from harness import config, metrics
+
+# (origin_ns, entries) of the iteration being recorded
+_trace = contextvars.ContextVar("trace", default=None)
+# connection setup phases of the request in flight
+_setup = contextvars.ContextVar("setup", default=None)
+
+
+@contextmanager
+def recording(entries, origin_ns=None):
+    token = _trace.set((origin_ns or time.perf_counter_ns(), entries))
+    try:
+        yield
+    finally:
+        _trace.reset(token)
+
+
+@contextmanager
+def setup_phases():
+    phases = {}
+    token = _setup.set(phases)
+    try:
+        yield phases
+    finally:
+        _setup.reset(token)
+
+
+def record(method, region, status, headers, t0, t_headers, t_end, phases):
+    # Phases are nanoseconds. dns/connect/tls are None on a reused connection;
+    # ttfb runs from sending the request to its response headers, minus any
+    # connection setup; transfer is reading the body.
+    metrics.request(method, region, status, (t_end - t0) / 1e9)
+    trace = _trace.get()
+    if trace is None:
+        return
+    origin, entries = trace
+    setup = sum(phases.get(name) or 0 for name in ("dns_ns", "connect_ns", "tls_ns"))
+    entries.append({
+        "method": method,
+        "region": region or "default",
+        "status": status,
+        "start_ns": t0 - origin,
+        "dns_ns": phases.get("dns_ns"),
+        "connect_ns": phases.get("connect_ns"),
+        "tls_ns": phases.get("tls_ns"),
+        "ttfb_ns": t_headers - t0 - setup,
+        "transfer_ns": t_end - t_headers,
+        "total_ns": t_end - t0,
+        "served_region": headers.get(config.region_header),
+        "headers": dict(headers),
+    })
+
+
+# ---------- requests / urllib3 ----------
+class _TimedConnect:
+
+    def _new_conn(self):
+        phases = _setup.get()
+        host = self._dns_host
+        t0 = time.perf_counter_ns()
+        try:
+            # Resolve here so DNS and TCP connect are timed separately.
+            self._dns_host = socket.getaddrinfo(host, self.port, type=socket.SOCK_STREAM)[0][4][0]
+        except OSError:
+            pass
+        t1 = time.perf_counter_ns()
+        try:
+            sock = super()._new_conn()
+        finally:
+            self._dns_host = host
+        if phases is not None:
+            phases["dns_ns"] = t1 - t0
+            phases["connect_ns"] = time.perf_counter_ns() - t1
+        return sock
+
+
+class TimedHTTPConnection(_TimedConnect, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnect, HTTPSConnection):
+
+    def connect(self):
+        phases = _setup.get()
+        t0 = time.perf_counter_ns()
+        super().connect()
+        if phases is not None and "connect_ns" in phases:
+            phases["tls_ns"] = time.perf_counter_ns() - t0 - phases["dns_ns"] - phases["connect_ns"]
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedAdapter(HTTPAdapter):
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+# ---------- aiohttp ----------
+def trace_config():
+    # aiohttp reports DNS and connection creation (TCP + TLS together).
+    import aiohttp
+
+    async def dns_start(session, ctx, params):
+        ctx.trace_request_ctx["dns_start"] = time.perf_counter_ns()
+
+    async def dns_end(session, ctx, params):
+        phases = ctx.trace_request_ctx
+        phases["dns_ns"] = time.perf_counter_ns() - phases.pop("dns_start")
+
+    async def connect_start(session, ctx, params):
+        ctx.trace_request_ctx["connect_start"] = time.perf_counter_ns()
+
+    async def connect_end(session, ctx, params):
+        phases = ctx.trace_request_ctx
+        phases["connect_ns"] = time.perf_counter_ns() - phases.pop("connect_start") - (phases.get("dns_ns") or 0)
+
+    tc = aiohttp.TraceConfig()
+    tc.on_dns_resolvehost_start.append(dns_start)
+    tc.on_dns_resolvehost_end.append(dns_end)
+    tc.on_connection_create_start.append(connect_start)
+    tc.on_connection_create_end.append(connect_end)
+    return tc
@@ -0,0 +1,30 @@
+import asyncio
+import hashlib
+
+# Bodies are hashed as they stream in, so memory stays flat whatever the size.
+chunk_size = 1024 * 1024
+# chunks at least this big are hashed off the event loop
+offload_size = 64 * 1024
+
+
+def digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def stream_digest(chunks):
+    h = hashlib.sha256()
+    for chunk in chunks:
+        h.update(chunk)
+    return h.hexdigest()
+
+
+async def astream_digest(chunks):
+    # Large chunks are hashed on a worker thread (hashlib drops the GIL for
+    # them) so the event loop stays free; small ones aren't worth the hop.
+    h = hashlib.sha256()
+    async for chunk in chunks:
+        if len(chunk) >= offload_size:
+            await asyncio.to_thread(h.update, chunk)
+        else:
+            h.update(chunk)
+    return h.hexdigest()
@@ -0,0 +1,194 @@
+import argparse
+import contextvars
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from threading import Thread
+
+import requests
+from tabulate import tabulate
+
+from harness import cleanup, config, history, metrics, results
+from harness.client import connect
+from harness.payload import Payload
+
+OPS = ("put", "overwrite", "delete", "head", "get")
+
+
+def parse_mix(spec):
+    # "put=2,overwrite=1,delete=1,head=3,get=3" -> relative weights
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPS:
+            raise ValueError(f"unknown operation in mix: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+@dataclass
+class Step:
+    # seconds after the start the step is due
+    at: float
+    worker: int
+    op: str
+    key: str
+    region: str
+    # payload seed for writes
+    seed: int
+
+
+@dataclass
+class Workload:
+    keys: int = 16
+    workers: int = 8
+    ops: int = 1000
+    # ops/s across all workers; 0 runs as fast as the workers can go
+    rate: float = 100
+    mix: str = "put=2,overwrite=1,delete=1,head=3,get=3"
+    regions: tuple = ("sjc", "fra")
+    consistent: bool = False
+    size: int = 1024
+    seed: int = None
+
+    def schedule(self, prefix):
+        # The whole run is drawn up front from the seed, so the same seed
+        # replays the same operations, keys, regions and payloads.
+        rng = random.Random(self.seed)
+        mix = parse_mix(self.mix)
+        names, weights = list(mix), list(mix.values())
+        written = []
+        for i in range(self.ops):
+            op = rng.choices(names, weights)[0]
+            if op == "overwrite" and written:
+                key = rng.choice(written)
+            else:
+                key = rng.randrange(self.keys)
+            if op in ("put", "overwrite") and key not in written:
+                written.append(key)
+            yield Step(
+                at=i / self.rate if self.rate else 0.0,
+                worker=i % self.workers,
+                op=op,
+                key=f"{prefix}/{key:05d}",
+                region=rng.choice(self.regions),
+                seed=rng.getrandbits(64),
+            )
+
+
+def execute(client, workload, step):
+    if step.op in ("put", "overwrite"):
+        return client.put(step.key, Payload(step.seed, workload.size), step.region, workload.consistent)
+    if step.op == "delete":
+        return client.delete(step.key, step.region, workload.consistent)
+    if step.op == "head":
+        return client.head(step.key, step.region, workload.consistent)
+    return client.get(step.key, step.region, workload.consistent)
+
+
+def run(client, workload, prefix):
+    # Each worker runs its share of the schedule, sleeping until a step is
+    # due; returns {op: [(status, latency_ns)]}, status None on a network error.
+    steps = {}
+    for step in workload.schedule(prefix):
+        steps.setdefault(step.worker, []).append(step)
+    outcomes = {op: [] for op in OPS}
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def worker(mine):
+        for step in mine:
+            delay = start + step.at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            t0 = time.perf_counter_ns()
+            try:
+                status = execute(client, workload, step).status_code
+            except requests.RequestException:
+                status = None
+            with lock:
+                outcomes[step.op].append((status, time.perf_counter_ns() - t0))
+
+    threads = [Thread(target=contextvars.copy_context().run, args=(worker, mine)) for mine in steps.values()]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return outcomes, time.perf_counter() - start
+
+
+def report(outcomes, elapsed):
+    rows = []
+    for op, done in outcomes.items():
+        if not done:
+            continue
+        latencies = sorted(latency for _, latency in done)
+        statuses = {}
+        for status, _ in done:
+            statuses[status or "error"] = statuses.get(status or "error", 0) + 1
+        rows.append([op, len(done), ", ".join(f"{s}: {n}" for s, n in sorted(statuses.items(), key=str)),
+                     f"{results.quantile(latencies, 0.5) / 1e6:.2f}", f"{results.quantile(latencies, 0.99) / 1e6:.2f}"])
+    total = sum(len(done) for done in outcomes.values())
+    print(tabulate(rows, headers=["Op", "Count", "Statuses", "p50 (ms)", "p99 (ms)"], tablefmt="grid"))
+    print(f"{total} ops in {elapsed:.2f} s ({total / elapsed:.1f} ops/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seeded multi-key, multi-region workload for consistency fuzzing")
+    parser.add_argument("--keys", type=int, default=Workload.keys, help="size of the shared keyspace")
+    parser.add_argument("--workers", type=int, default=Workload.workers)
+    parser.add_argument("--ops", type=int, default=Workload.ops, help="total operations")
+    parser.add_argument("--rate", type=float, default=Workload.rate, help="ops/s, 0 for unthrottled")
+    parser.add_argument("--mix", default=Workload.mix, help="relative weights of put/overwrite/delete/head/get")
+    parser.add_argument("--regions", default=",".join(Workload.regions))
+    parser.add_argument("--consistent", action="store_true", help="send X-Tigris-Consistent on every request")
+    parser.add_argument("--size", type=int, default=Workload.size, help="payload bytes")
+    parser.add_argument("--seed", type=int, default=config.seed)
+    parser.add_argument("--history", default=config.history,
+                        help="operation history file (default: <run prefix>.history.jsonl)")
+    args = parser.parse_args()
+    seed = random.randrange(2 ** 32) if args.seed is None else args.seed
+    workload = Workload(
+        keys=args.keys,
+        workers=args.workers,
+        ops=args.ops,
+        rate=args.rate,
+        mix=args.mix,
+        regions=tuple(args.regions.split(",")),
+        consistent=args.consistent,
+        size=args.size,
+        seed=seed,
+    )
+    # Keys are fresh per run so every one starts absent.
+    prefix = f"workload-{uuid.uuid4()}"
+    # A file per run: appending to one shared file would mix runs the
+    # checker cannot tell apart.
+    history_path = args.history or f"{prefix}.history.jsonl"
+    print(f"Workload {prefix} (seed {seed}), history in {history_path}")
+    metrics.serve()
+    client = connect()
+    client.pool_size = max(client.pool_size, workload.workers)
+    client.warm(workload.regions)
+    log = history.History(history_path)
+    try:
+        with history.recording(log):
+            outcomes, elapsed = run(client, workload, prefix)
+    finally:
+        log.close()
+        try:
+            cleanup.after_run(sorted({op.key.partition("/")[2] for op in log.ops if op.kind == "write"}), client)
+        finally:
+            client.close()
+    report(outcomes, elapsed)
+    if workload.consistent:
+        print(history.report(history.check(log.ops)))
+    else:
+        # Without X-Tigris-Consistent reads may be stale, so none is checked.
+        print(f"Linearizability: NOT CHECKED (no --consistent; `python3 -m harness.history {history_path} --all` "
+              f"checks the eventual reads too)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+from harness.engine import main
+
+main("multipart-cross-region")
@@ -0,0 +1,5 @@
+import os
+
+# The stand-in accepts any keys; set them before the harness loads credentials.
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import statistics
+
+import pytest
+
+from harness import aio, results, standin
+from harness.scenarios import SCENARIOS
+
+LAG_MS = 50
+# Enough iterations in flight to interleave on the event loop without asking
+# more CPU of the host than it has (the stand-in runs in this process too).
+CONCURRENCY = min(8, 2 * (os.cpu_count() or 1))
+
+
+@pytest.fixture(scope="module")
+def endpoint():
+    server = standin.serve(regions=["sjc", "fra"], default_region="fra", delay=f"fixed:{LAG_MS / 1e3}")
+    yield server.endpoint
+    server.shutdown()
+
+
+def convergence_ms(endpoint, concurrency, iterations=16, size=1024 * 1024):
+    scenario = SCENARIOS["write-cross-region"]
+
+    async def go():
+        client = await aio.open_client(scenario, concurrency, endpoint)
+        try:
+            return await aio.run(client, scenario, results.Sink(), iterations, size, concurrency)
+        finally:
+            await client.close()
+
+    records = asyncio.run(go())
+    assert all(r.status == "PASS" for r in records)
+    return [r.convergence_ns / 1e6 for r in records]
+
+
+def test_convergence_stable_under_concurrency(endpoint):
+    # With a fixed replication lag every iteration measures about the same
+    # convergence however many run at once; iterations stalling each other's
+    # clocks show up as a shifted median or a minimum far below the lag.
+    alone = statistics.median(convergence_ms(endpoint, 1))
+    together = convergence_ms(endpoint, CONCURRENCY)
+    assert abs(statistics.median(together) - alone) < LAG_MS * 0.15
+    assert min(together) > LAG_MS * 0.5
+
+
+def test_concurrent_writers_leave_together(endpoint):
+    # Writers are released from one barrier on threads, not queued behind
+    # whatever else the event loop is doing (that left them 80-100 ms apart).
+    # The bounds leave room for a busy host.
+    scenario = SCENARIOS["concurrent-write"]
+
+    async def go():
+        client = await aio.open_client(scenario, CONCURRENCY, endpoint)
+        try:
+            return await aio.run(client, scenario, results.Sink(), 4 * CONCURRENCY, None, CONCURRENCY)
+        finally:
+            await client.close()
+
+    records = asyncio.run(go())
+    assert all(len(r.writes) == len(scenario.put_regions) for r in records)
+    skews_ms = [r.skew_ns / 1e6 for r in records]
+    assert statistics.median(skews_ms) < 5
+    assert max(skews_ms) < 25
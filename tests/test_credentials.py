@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from harness import aio, credentials, standin
+from harness.client import Client, load_auth
+
+BUCKET = "credentials-test"
+
+
+@pytest.fixture
+def shared_file(tmp_path, monkeypatch):
+    # Session credentials from the shared file only, looked up afresh.
+    path = tmp_path / "credentials"
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN", "AWS_PROFILE",
+                 "AWS_DEFAULT_PROFILE"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("AWS_SHARED_CREDENTIALS_FILE", str(path))
+    monkeypatch.setenv("AWS_CONFIG_FILE", str(tmp_path / "config"))
+    monkeypatch.setattr(credentials, "_loaded", None)
+
+    def write(token):
+        path.write_text(f"[default]\naws_access_key_id = key\naws_secret_access_key = secret\n"
+                        f"aws_session_token = {token}\n")
+
+    return write
+
+
+@pytest.fixture
+def endpoint(monkeypatch):
+    # A stand-in that turns away the session tokens in `expired`.
+    expired = set()
+    dispatch = standin.Handler.dispatch
+
+    def checked(self, handler):
+        if self.headers.get("x-amz-security-token") in expired:
+            if self.command in ("PUT", "POST"):
+                self.read_body()
+            return self.error(400, "ExpiredToken", "The provided token has expired.")
+        return dispatch(self, handler)
+
+    monkeypatch.setattr(standin.Handler, "dispatch", checked)
+    server = standin.serve()
+    yield server.endpoint, expired
+    server.shutdown()
+
+
+def test_client_renews_expired_session(shared_file, endpoint):
+    url, expired = endpoint
+    shared_file("old")
+    client = Client(url, BUCKET, load_auth())
+    try:
+        client.ensure_bucket()
+        assert client.put("k", b"one").status_code == 200
+        # The session ends and new keys land in the shared file.
+        expired.add("old")
+        shared_file("new")
+        assert client.put("k", b"two").status_code == 200
+        assert credentials.load().token == "new"
+    finally:
+        client.close()
+
+
+def test_async_client_renews_expired_session(shared_file, endpoint):
+    url, expired = endpoint
+    shared_file("old")
+
+    async def go():
+        client = aio.AsyncClient(url, BUCKET)
+        await client.open()
+        try:
+            await client.ensure_bucket()
+            expired.add("old")
+            shared_file("new")
+            return (await client.head("missing")).status_code, (await client.get("missing")).status_code
+        finally:
+            await client.close()
+
+    assert asyncio.run(go()) == (404, 404)
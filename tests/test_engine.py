@@ -0,0 +1,62 @@
+import asyncio
+import dataclasses
+
+import pytest
+
+from harness import aio, engine, results, standin
+from harness.client import Client, load_auth
+from harness.scenarios import SCENARIOS
+
+BUCKET = "engine-test"
+LAG_MS = 20
+
+
+@pytest.fixture(scope="module")
+def endpoint():
+    server = standin.serve(regions=["sjc", "fra"], default_region="fra", delay=f"fixed:{LAG_MS / 1e3}")
+    yield server.endpoint
+    server.shutdown()
+
+
+def scenario(name):
+    # Small objects, multipart ones in three parts, so every flavour runs in
+    # a blink.
+    s = SCENARIOS[name]
+    if s.part_size:
+        return dataclasses.replace(s, size=12 * 1024 * 1024, part_size=5 * 1024 * 1024)
+    return dataclasses.replace(s, size=64 * 1024)
+
+
+def run_threaded(endpoint, scenario, iterations):
+    client = Client(endpoint, BUCKET, load_auth())
+    try:
+        client.ensure_bucket()
+        client.warm(scenario.regions())
+        return engine.run(client, scenario, results.Sink(), iterations)
+    finally:
+        client.close()
+
+
+def run_async(endpoint, scenario, iterations):
+    async def go():
+        client = await aio.open_client(scenario, 2, endpoint, BUCKET)
+        try:
+            return await aio.run(client, scenario, results.Sink(), iterations, concurrency=2)
+        finally:
+            await client.close()
+
+    return asyncio.run(go())
+
+
+@pytest.mark.parametrize("name", ["write-cross-region", "overwrite-cross-region", "delete-cross-region",
+                                  "concurrent-write", "multipart-cross-region"])
+def test_runners_agree(endpoint, name):
+    # Both runners drive the same iteration steps: same verdicts, and the
+    # cross-region lag is measured the same way.
+    s = scenario(name)
+    for records in (run_threaded(endpoint, s, 3), run_async(endpoint, s, 3)):
+        assert [r.status for r in records] == ["PASS"] * 3
+        if s.part_size:
+            assert all(r.parts == 3 for r in records)
+        if s.op != "concurrent":
+            assert all(0 < r.convergence_ns / 1e6 < 4 * LAG_MS for r in records)
@@ -0,0 +1,43 @@
+import math
+import random
+
+from harness.histogram import Histogram
+
+
+def lognormal(n, seed):
+    rng = random.Random(seed)
+    return [int(rng.lognormvariate(15, 2)) for _ in range(n)]
+
+
+def test_quantiles_within_sub_bucket_bound():
+    # Reported values never undershoot and overshoot by at most one
+    # sub-bucket: 2^-(sub_bits - 1) relative, exact below 2^sub_bits.
+    values = lognormal(20000, 1) + list(range(300))
+    histogram = Histogram()
+    for value in values:
+        histogram.record(value)
+    ordered = sorted(values)
+    bound = 2 ** -(histogram.sub_bits - 1)
+    for q in (0.0, 0.001, 0.01, 0.1, 0.5, 0.9, 0.99, 0.999, 1.0):
+        exact = ordered[max(math.ceil(q * len(ordered)), 1) - 1]
+        reported = histogram.quantile(q)
+        assert exact <= reported <= exact * (1 + bound)
+        if exact < 2 ** histogram.sub_bits:
+            assert reported == exact
+    assert histogram.quantile(1.0) == histogram.max == ordered[-1]
+    assert histogram.min == ordered[0] and len(histogram) == len(values)
+
+
+def test_merge_matches_recording_everything():
+    parts = [lognormal(5000, seed) for seed in range(4)]
+    merged, whole = Histogram(), Histogram()
+    for values in parts:
+        part = Histogram()
+        for value in values:
+            part.record(value)
+            whole.record(value)
+        # Snapshots carry histograms as dicts; merging those is the same.
+        merged.merge(Histogram.from_dict(part.to_dict()))
+    assert merged.to_dict() == whole.to_dict() and len(merged) == len(whole)
+    assert all(merged.quantile(q) == whole.quantile(q) for q in (0.5, 0.99, 1.0))
+    assert Histogram().merge(merged).to_dict() == merged.to_dict()
@@ -0,0 +1,106 @@
+import random
+import time
+
+from harness import history
+from harness.history import ANY, Op
+
+
+def write(value, invoke, complete, key="b/k"):
+    return Op(key, "write", value, invoke, complete)
+
+
+def read(value, invoke, complete, key="b/k"):
+    return Op(key, "read", value, invoke, complete)
+
+
+def register_history(n, workers=8, seed=1, key="b/k"):
+    # `workers` clients taking turns on one register: every op takes effect
+    # at a random point inside its interval and reads return the value at
+    # that point, so the history is linearizable by construction.
+    rng = random.Random(seed)
+    clock = [0] * workers
+    timeline = []
+    for i in range(n):
+        w = i % workers
+        invoke = clock[w] + rng.randint(1, 50)
+        complete = clock[w] = invoke + rng.randint(1, 200)
+        timeline.append((rng.uniform(invoke, complete), rng.random() < 0.3, invoke, complete, f"v{i}"))
+    ops, value = [], None
+    for _, is_write, invoke, complete, v in sorted(timeline):
+        if is_write:
+            value = v
+            ops.append(write(v, invoke, complete, key))
+        else:
+            ops.append(read(value, invoke, complete, key))
+    return ops
+
+
+def test_linearizable_history():
+    ops = [
+        write("a", 0, 10),
+        read("a", 5, 15),
+        # concurrent with the write of b: may see either value
+        write("b", 12, 20),
+        read("a", 14, 22),
+        read("b", 16, 24),
+        read("b", 25, 30),
+        # no response: may or may not have happened
+        write(ANY, 32, None),
+        read("b", 40, 45),
+    ]
+    assert history.linearizable(ops)
+    assert history.check(ops, consistent_only=False).ok
+
+
+def test_keys_are_checked_apart():
+    # Each key on its own is fine; as one register the reads would conflict.
+    ops = [write("a", 0, 10, "b/x"), write("b", 0, 10, "b/y"), read("a", 20, 30, "b/x"), read("b", 20, 30, "b/y")]
+    assert history.linearizable(ops)
+
+
+def test_stale_read():
+    # A read sees the old value after an earlier read already saw the new one.
+    ops = [write("a", 0, 10), write("b", 20, 100), read("b", 30, 40), read("a", 50, 60), read("b", 70, 80)]
+    assert not history.linearizable(ops)
+    assert history.minimize(ops) == ops[:4]
+
+
+def test_lost_write():
+    # An acknowledged write is never seen: reads after it return the value
+    # it replaced.
+    ops = [write("a", 0, 10), read("a", 15, 18), write("b", 20, 30), read("a", 40, 50), read("a", 60, 70)]
+    result = history.check(ops, consistent_only=False)
+    assert result.violations == {"b/k": [ops[0], ops[2], ops[3]]}
+
+
+def test_minimal_history_keeps_original_ops():
+    # The write of b is still open where the search gets stuck; the minimal
+    # history shows it as it was recorded.
+    ops = [write("a", 0, 10), write("b", 20, 30), read("b", 22, 24), read("a", 25, 27)]
+    minimal = history.minimize(ops)
+    assert minimal == ops
+    assert all(a is b for a, b in zip(minimal, ops))
+
+
+def test_long_failing_history_is_quick():
+    # 20k ops from 8 workers with one stale read near the end: found and
+    # shrunk to the few ops that explain it in seconds.
+    ops = register_history(20000)
+    assert history.linearizable(ops)
+    late = max((op for op in ops if op.kind == "read"), key=lambda op: op.invoke_ns)
+    first = min((op for op in ops if op.kind == "write"), key=lambda op: op.invoke_ns)
+    late.value = first.value
+    start = time.perf_counter()
+    result = history.check(ops, consistent_only=False)
+    assert time.perf_counter() - start < 10
+    assert len(result.violations["b/k"]) <= 4
+    assert late in result.violations["b/k"]
+
+
+def test_no_reads_is_not_a_pass():
+    # Eventual reads are left out by default: writes alone prove nothing.
+    ops = [write("a", 0, 10), read("b", 20, 30)]
+    result = history.check(ops)
+    assert result.ok and result.reads == 0
+    assert "NOT CHECKED" in history.report(result)
+    assert "FAIL" in history.report(history.check(ops, consistent_only=False))
@@ -0,0 +1,62 @@
+import threading
+import time
+from array import array
+from types import SimpleNamespace
+
+from harness import listing
+
+PREFIX = "list-visibility-test/"
+
+
+class Bucket:
+    # ListObjectsV2 over the keys made visible so far, and PUTs that fail
+    # for the keys in `failing`.
+
+    def __init__(self, failing=()):
+        self.visible = set()
+        self.failing = set(failing)
+
+    def list_objects(self, prefix, token=None, start_after=None, max_keys=1000, region=None, consistent=False):
+        after = token or start_after or ""
+        keys = sorted(k for k in self.visible if k > after)
+        page = keys[:max_keys]
+        truncated = len(keys) > max_keys
+        text = "".join(f"<Key>{k}</Key>" for k in page)
+        if truncated:
+            text += f"<IsTruncated>true</IsTruncated><NextContinuationToken>{page[-1]}</NextContinuationToken>"
+        return SimpleNamespace(status_code=200, text=text, acked_ns=time.perf_counter_ns())
+
+    def put(self, key, data, region=None, consistent=False):
+        if int(key[len(PREFIX):]) in self.failing:
+            return SimpleNamespace(status_code=500)
+        self.visible.add(key)
+        return SimpleNamespace(status_code=200, acked_ns=time.perf_counter_ns())
+
+
+def test_slow_key_does_not_relist_the_suffix():
+    bucket, index = Bucket(), listing.Index(5000)
+    bucket.visible = {listing.key_name(PREFIX, i) for i in range(5000) if i != 10}
+    listing.list_round(bucket, PREFIX, index, None, False)
+    assert index.listed == 4999 and index.missing == {10}
+    for _ in range(20):
+        listing.list_round(bucket, PREFIX, index, None, False)
+    # Each round looked at one key where the gap is, nothing after it.
+    assert index.listed == 4999 + 20
+    bucket.visible.add(listing.key_name(PREFIX, 10))
+    listing.list_round(bucket, PREFIX, index, None, False)
+    assert index.done and index.seen == 5000
+
+
+def test_failed_put_is_skipped_at_once():
+    bucket, index = Bucket(failing={3}), listing.Index(8)
+    skipped = []
+
+    def failed(i):
+        skipped.append(i)
+        index.skip([i])
+
+    acked_ns = array("q", [0]) * 8
+    listing.write_keys(bucket, PREFIX, 8, 0, None, False, 1, acked_ns, threading.Event(), failed)
+    assert skipped == [3] and not acked_ns[3]
+    listing.list_round(bucket, PREFIX, index, None, False)
+    assert index.done and index.seen == 7 and not index.missing
@@ -0,0 +1,21 @@
+import zlib
+
+from harness import payload
+from harness.payload import Payload
+
+
+def test_content_does_not_repeat():
+    # Nothing for a compressing or deduping store to save: every 64KB block
+    # differs and the whole does not compress.
+    data = b"".join(Payload(1, 3 * 1024 * 1024 + 5))
+    blocks = [data[i:i + payload.BLOCK] for i in range(0, len(data), payload.BLOCK)]
+    assert len(set(blocks)) == len(blocks)
+    assert len(zlib.compress(data)) > len(data)
+
+
+def test_content_is_reproducible_and_parts_cover_it():
+    p = Payload(7, 10 * 1024 * 1024 + 1)
+    data = b"".join(p)
+    assert len(data) == p.size
+    assert b"".join(Payload(7, p.size)) == data
+    assert b"".join(b"".join(part) for part in p.parts(4 * 1024 * 1024)) == data
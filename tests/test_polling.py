@@ -0,0 +1,19 @@
+import random
+
+from harness import polling
+
+
+def test_adaptive_schedule_bounds():
+    # Every `initial` seconds through the dense window, then growing by
+    # `factor` up to `cap`, each delay within the jitter of its step.
+    schedule = polling.Adaptive(initial=0.002, dense=0.05, factor=1.5, cap=1.0, jitter=0.2, rng=random.Random(1))
+    assert [schedule.delay(t / 1000) for t in range(0, 50, 2)] == [0.002] * 25
+    step = 0.002
+    for _ in range(40):
+        step = min(step * 1.5, 1.0)
+        assert 0.8 * step <= schedule.delay(0.05) <= 1.2 * step
+    assert schedule.current == 1.0
+
+
+def test_fixed_schedule():
+    assert {polling.Fixed(0.25).delay(t) for t in (0, 1, 100)} == {0.25}
@@ -0,0 +1,33 @@
+import pytest
+
+from harness import results
+from harness.results import Record
+from harness.scenarios import SCENARIOS
+
+
+def records():
+    # One record with every kind of field filled in, and one failure that
+    # leaves the optional ones empty.
+    full = Record.for_scenario(SCENARIOS["concurrent-write"], 1, "k-1", 1024)
+    full.status, full.attempts, full.convergence_ns, full.last_stale_ns = "PASS", 3, 12_345_678, 11_000_000
+    full.winner, full.skew_ns, full.parts, full.upload_ns = "fra", 250_000, 3, 9_000_000
+    full.clock_error_ns, full.first_probe_ns = 40_000, 1_500_000
+    full.writes = [{"region": "sjc", "sent_ns": 0, "acked_ns": 5_000_000, "status": 200, "etag": "a"}]
+    full.reads = [{"region": "fra", "probes": 4, "status": "PASS"}]
+    full.trace = [{"method": "PUT", "status": 200, "phases": {"connect": 1.5}}]
+    failed = Record.for_scenario(SCENARIOS["write-cross-region"], 2, "k-2", 2048)
+    failed.fail('No convergence, "quoted", within 30s', "TIMEOUT")
+    return [full, failed]
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".csv"])
+def test_round_trip(tmp_path, suffix):
+    path = str(tmp_path / f"results{suffix}")
+    written = records()
+    for _ in range(2):
+        # A second run appends to the same file (without a second CSV header).
+        sink = results.open_sink(path)
+        for record in written:
+            sink.write(record)
+        sink.close()
+    assert results.load(path) == written * 2
@@ -0,0 +1,24 @@
+import asyncio
+
+from harness import results, scheduler, standin
+from harness.scenarios import SCENARIOS
+
+LAG_MS = 30
+
+
+def test_first_probes_follow_the_ack(monkeypatch):
+    # More writers than the process can keep up with: admission holds them
+    # back, and no key is measured from a first probe that came late.
+    server = standin.serve(regions=["sjc", "fra"], default_region="fra", delay=f"fixed:{LAG_MS / 1e3}")
+    monkeypatch.setattr("harness.config.endpoint", server.endpoint)
+    try:
+        sink = results.Sink()
+        stats = asyncio.run(scheduler.track(SCENARIOS["write-cross-region"], sink, 500, 64, 256, 1024, 0.05))
+    finally:
+        server.shutdown()
+    passed = [r for r in sink.records if r.status == "PASS"]
+    assert len(sink.records) == 500
+    assert len(passed) > 400
+    assert all(r.first_probe_ns <= 50e6 for r in passed)
+    assert all(r.status in ("PASS", "LATE") for r in sink.records)
+    assert stats["peak"] <= 64
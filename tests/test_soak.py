@@ -0,0 +1,26 @@
+import json
+import time
+
+from harness import config, engine, soak
+from harness.scenarios import SCENARIOS
+
+
+def test_overrun_skips_slots(tmp_path, monkeypatch, capsys):
+    # One iteration runs 2.5 intervals long: the two slots it overran are
+    # skipped and counted, and the soak does not burst to catch up.
+    monkeypatch.setattr(config, "cleanup", False)
+    starts = []
+
+    def run_iteration(client, scenario, record):
+        starts.append(time.time())
+        time.sleep(0.25 if len(starts) == 2 else 0)
+        record.convergence_ns = 1
+
+    monkeypatch.setattr(engine, "run_iteration", run_iteration)
+    scenario = SCENARIOS["write-cross-region"]
+    soak.soak(None, [scenario], str(tmp_path), 0.1, 0.75, 60, 1, 3600, 3600, 2)
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    assert all(gap > 0.08 for gap in gaps)
+    snapshot = json.loads((tmp_path / "snapshots.jsonl").read_text())
+    assert snapshot["skipped"] == snapshot["lifetime_skipped"] == 2
+    assert "Skipped" in capsys.readouterr().out
@@ -0,0 +1,45 @@
+import time
+
+from harness import standin
+
+PATH = ("bucket", "key")
+
+
+def test_replica_lag():
+    # A write is readable in its own region at once, in the others only
+    # after the replication delay; consistent reads see it everywhere.
+    store = standin.Store(regions=["sjc", "fra"], delay="fixed:0.1")
+    store.write(PATH, b"one", "sjc")
+    assert store.read(PATH, "sjc").body == b"one"
+    assert store.read(PATH, "fra") is None
+    assert store.read(PATH, "fra", consistent=True).body == b"one"
+    time.sleep(0.1)
+    assert store.read(PATH, "fra").body == b"one"
+
+
+def test_consistent_write_reaches_every_replica():
+    store = standin.Store(regions=["sjc", "fra"], delay="fixed:60")
+    store.write(PATH, b"one", "sjc", consistent=True)
+    assert store.read(PATH, "fra").body == b"one"
+
+
+def test_last_writer_wins():
+    # Two regions write the same key before either write has replicated:
+    # the older write arriving late does not replace the newer one, and both
+    # replicas settle on the newer.
+    store = standin.Store(regions=["sjc", "fra"], delay="fixed:0.1")
+    store.write(PATH, b"old", "sjc")
+    store.write(PATH, b"new", "fra")
+    assert store.read(PATH, "sjc").body == b"old"
+    time.sleep(0.1)
+    assert store.read(PATH, "sjc").body == store.read(PATH, "fra").body == b"new"
+
+
+def test_delete_replicates_as_a_write():
+    store = standin.Store(regions=["sjc", "fra"], delay="fixed:0.1")
+    store.write(PATH, b"one", "sjc", consistent=True)
+    store.write(PATH, b"", "sjc", deleted=True)
+    assert store.read(PATH, "sjc") is None
+    assert store.read(PATH, "fra").body == b"one"
+    time.sleep(0.1)
+    assert store.read(PATH, "fra") is None